@@ -1,54 +1,36 @@
 # Import necessary libraries
 import streamlit as st  # For building the web interface
-from langchain_core.prompts import PromptTemplate  # For creating structured prompts
-from langchain_openai import OpenAI  # OpenAI LLM integration
-
-# Define the template for text rewriting
-# This template contains instructions for the AI to rewrite text based on tone and dialect
-template = """
-    Below is a draft text that may be poorly worded.
-    Your goal is to:
-    - Properly redact the draft text
-    - Convert the draft text to a specified tone
-    - Convert the draft text to a specified dialect
-
-    Here are some examples different Tones:
-    - Formal: Greetings! OpenAI has announced that Sam Altman is rejoining the company as its Chief Executive Officer. After a period of five days of conversations, discussions, and deliberations, the decision to bring back Altman, who had been previously dismissed, has been made. We are delighted to welcome Sam back to OpenAI.
-    - Informal: Hey everyone, it's been a wild week! We've got some exciting news to share - Sam Altman is back at OpenAI, taking up the role of chief executive. After a bunch of intense talks, debates, and convincing, Altman is making his triumphant return to the AI startup he co-founded.  
-
-    Here are some examples of words in different dialects:
-    - American: French Fries, cotton candy, apartment, garbage, \
-        cookie, green thumb, parking lot, pants, windshield
-    - British: chips, candyfloss, flag, rubbish, biscuit, green fingers, \
-        car park, trousers, windscreen
-
-    Example Sentences from each dialect:
-    - American: Greetings! OpenAI has announced that Sam Altman is rejoining the company as its Chief Executive Officer. After a period of five days of conversations, discussions, and deliberations, the decision to bring back Altman, who had been previously dismissed, has been made. We are delighted to welcome Sam back to OpenAI.
-    - British: On Wednesday, OpenAI, the esteemed artificial intelligence start-up, announced that Sam Altman would be returning as its Chief Executive Officer. This decisive move follows five days of deliberation, discourse and persuasion, after Altman's abrupt departure from the company which he had co-established.
-
-    Please start the redaction with a warm introduction. Add the introduction \
-        if you need to.
-    
-    Below is the draft text, tone, and dialect:
-    DRAFT: {draft}
-    TONE: {tone}
-    DIALECT: {dialect}
-
-    YOUR {dialect} RESPONSE:
-"""
-
-# Create a PromptTemplate with variables for tone, dialect, and draft text
-prompt = PromptTemplate(
-    input_variables=["tone", "dialect", "draft"],
-    template=template,
-)
+import sys  # For making the shared helpers importable
+from concurrent.futures import ThreadPoolExecutor  # For generating all variants at once
+from pathlib import Path  # For locating the repository root
+
+# Make the shared helpers in the repository root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.clients import CLIENT_TTL, MAX_CACHED_CLIENTS  # Limits of the cached OpenAI clients
+from common.pipelines import DIALECTS, MAX_INPUT_WORDS, TONES, build_llm, format_rewrite_prompt  # Prompt and LLM logic
+# Heavy helpers (LangChain, OpenAI) are imported below, once a request is submitted,
+# so the page renders its inputs without waiting for them
+
+# Also cache responses generated with temperature > 0 (they would otherwise vary between runs)
+CACHE_NONDETERMINISTIC = False
+
+# Render the rewritten text token by token as it is generated
+STREAM_RESPONSE = True
+
+# Show a table with the time spent in each stage of the request below the text
+SHOW_LATENCY_PANEL = False
+
+# The tones, dialects, examples and prompt templates live in common/pipelines.py,
+# shared with the HTTP service; this page only handles the user interface
 
 # Function to initialize the OpenAI LLM with the provided API key
+# Cached so the client is built once per API key and reused by every rerun and session
+@st.cache_resource(max_entries=MAX_CACHED_CLIENTS, ttl=CLIENT_TTL)
 def load_LLM(openai_api_key):
     """Logic for loading the chain you want to use should go here."""
-    # Create an OpenAI LLM instance with temperature=0.7 (more creative outputs)
-    llm = OpenAI(temperature=.7, openai_api_key=openai_api_key)
-    return llm
+    # OpenAI LLM with temperature=0.7 (more creative outputs), the shared HTTP client,
+    # the response cache (bypassed at temperature .7 unless opted in) and tracing
+    return build_llm("rewrite", openai_api_key, cache_nondeterministic=CACHE_NONDETERMINISTIC)
 
 # Configure the Streamlit page
 st.set_page_config(page_title="Re-write your text")  # Set browser tab title
@@ -97,9 +79,9 @@ def get_draft():
 # Get the draft text from the user
 draft_input = get_draft()
 
-# Check if the text is too long (more than 700 words)
-if len(draft_input.split(" ")) > 700:
-    st.write("Please enter a shorter text. The maximum length is 700 words.")
+# Check if the text is too long (more than MAX_INPUT_WORDS words)
+if len(draft_input.split(" ")) > MAX_INPUT_WORDS:
+    st.write(f"Please enter a shorter text. The maximum length is {MAX_INPUT_WORDS} words.")
     st.stop()  # Stop execution if text is too long
 
 # Create a two-column layout for tone and dialect options
@@ -109,15 +91,21 @@ col1, col2 = st.columns(2)
 with col1:
     option_tone = st.selectbox(
         'Which tone would you like your redaction to have?',
-        ('Formal', 'Informal')  # Options for tone
+        TONES  # Options for tone
     )
     
 # Right column: Dialect selection dropdown
 with col2:
     option_dialect = st.selectbox(
         'Which English Dialect would you like?',
-        ('American', 'British')  # Options for dialect
+        DIALECTS  # Options for dialect
     )
+
+# Checkbox to generate every tone and dialect variant of the draft in one go
+compare_all = st.checkbox(
+    'Compare all tones and dialects',
+    help='Generate all variants at once, then switch between them instantly'
+)
     
 # Section for displaying the rewritten text
 st.markdown("### Your Re-written text:")
@@ -132,19 +120,78 @@ if draft_input:
             icon="⚠️")
         st.stop()  # Stop execution if API key is missing
 
+    # Import the request helpers now that there is a draft to rewrite
+    from common.coalescing import coalesced_invoke  # Rate-limited, retried and shared calls
+    from common.streaming import TimedStream, stream_completion  # Token streaming helpers
+    from common.tracing import trace  # Per-request latency breakdown
+
     # Initialize the LLM with the API key
     llm = load_LLM(openai_api_key=openai_api_key)
 
-    # Format the prompt with the user's selections and draft text
-    prompt_with_draft = prompt.format(
-        tone=option_tone,  # Selected tone
-        dialect=option_dialect,  # Selected dialect
-        draft=draft_input  # User's text
-    )
-
-    # Generate the improved redaction using the LLM
-    # Note: This should be updated to use llm.invoke() for newer versions of LangChain
-    improved_redaction = llm(prompt_with_draft)
+    # Keep the rewritten variants of the current draft only
+    if st.session_state.get("variants_draft") != draft_input:
+        st.session_state["variants_draft"] = draft_input
+        st.session_state["variants"] = {}
+    variants = st.session_state["variants"]
+
+    # In compare mode, generate every missing (tone, dialect) variant concurrently
+    # Each call goes through the scheduler, which keeps under the rate limits and retries 429s
+    missing = [(tone, dialect) for tone in TONES for dialect in DIALECTS if (tone, dialect) not in variants]
+    if compare_all and missing:
+        with st.spinner(f"Generating {len(missing)} variants..."):
+            with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+                futures = {
+                    pool.submit(coalesced_invoke, llm, format_rewrite_prompt(tone, dialect, draft_input)): (tone, dialect)
+                    for tone, dialect in missing
+                }
+            failed = []
+            for future, variant in futures.items():
+                try:
+                    variants[variant] = future.result()
+                except Exception as error:  # A variant that still fails after its retries only fails itself
+                    failed.append(error)
+        if failed:
+            # The variants that were generated are kept, so the next run only retries the failed ones
+            st.error(
+                f"{len(failed)} of {len(missing)} variants could not be generated "
+                f"({type(failed[0]).__name__}: {failed[0]}). Try again in a moment."
+            )
+            if (option_tone, option_dialect) not in variants:
+                st.stop()  # Do not ask again right away for the variant that just failed
+
+    # Show a variant that was already generated for this draft without calling the model again
+    if (option_tone, option_dialect) in variants:
+        st.write(variants[(option_tone, option_dialect)])
+        st.stop()
 
-    # Display the rewritten text
-    st.write(improved_redaction)
\ No newline at end of file
+    # Format the prompt with the user's selections and draft text
+    prompt_with_draft = format_rewrite_prompt(option_tone, option_dialect, draft_input)
+
+    # Count the prompt tokens of this request (the examples dominate short drafts)
+    prompt_tokens = llm.get_num_tokens(prompt_with_draft)
+
+    # Time the generation (exported when LLM_TRACE_PATH is set)
+    with trace("rewrite", tone=option_tone, dialect=option_dialect) as request_trace:
+        if STREAM_RESPONSE:
+            # Stream the improved redaction into the page as tokens arrive
+            stream = TimedStream(stream_completion(llm, prompt_with_draft))
+            improved_redaction = st.write_stream(stream)
+
+            # Show the prompt size and how long the user waited for the first token and the full text
+            st.caption(f"Prompt: {prompt_tokens} tokens. {stream.summary()}")
+        else:
+            # Generate the improved redaction using the LLM, through the scheduler
+            # (rate limits and retries) and shared with identical requests in flight
+            improved_redaction = coalesced_invoke(llm, prompt_with_draft)
+
+            # Display the rewritten text and the prompt size
+            st.write(improved_redaction)
+            st.caption(f"Prompt: {prompt_tokens} tokens")
+
+    # Show where the time of this request went
+    if SHOW_LATENCY_PANEL:
+        with st.expander("Latency breakdown"):
+            st.dataframe(request_trace.rows(), hide_index=True)
+
+    # Remember the variant so switching back to this tone and dialect is instant
+    variants[(option_tone, option_dialect)] = improved_redaction
\ No newline at end of file
@@ -1,7 +1,23 @@
 # Import necessary libraries
 import streamlit as st  # For creating the web application interface
-from langchain_openai import OpenAI  # OpenAI LLM integration for LangChain
-from langchain_core.prompts import PromptTemplate  # For structured prompt creation
+import sys  # For making the shared helpers importable
+from pathlib import Path  # For locating the repository root
+
+# Make the shared helpers in the repository root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.clients import CLIENT_TTL, MAX_CACHED_CLIENTS  # Limits of the cached OpenAI clients
+from common.pipelines import build_llm, format_blog_prompt  # Prompt and LLM logic shared with the HTTP service
+# Heavy helpers (LangChain, OpenAI) are imported below, once a request is submitted,
+# so the page renders its inputs without waiting for them
+
+# Also cache responses generated with temperature > 0 (they would otherwise vary between runs)
+CACHE_NONDETERMINISTIC = False
+
+# Render the blog post token by token as it is generated
+STREAM_RESPONSE = True
+
+# Show a table with the time spent in each stage of the request below the post
+SHOW_LATENCY_PANEL = False
 
 # Configure the Streamlit page with a title that appears in the browser tab
 st.set_page_config(
@@ -18,35 +34,38 @@ openai_api_key = st.sidebar.text_input(
    type="password"  # Makes the input appear as dots for security
 )
 
+# Function to initialize the OpenAI LLM with the provided API key
+# Cached so the client is built once per API key and reused by every rerun and session
+@st.cache_resource(max_entries=MAX_CACHED_CLIENTS, ttl=CLIENT_TTL)
+def load_LLM(openai_api_key):
+   # OpenAI LLM with the shared HTTP client, the response cache and tracing
+   # Its temperature (0.7) bypasses the cache unless CACHE_NONDETERMINISTIC is set,
+   # and max_tokens (2048) leaves room for the whole post
+   return build_llm("blog", openai_api_key, cache_nondeterministic=CACHE_NONDETERMINISTIC)
+
 # Define the function that will generate the blog post
 def generate_response(topic):
-   # Initialize the OpenAI language model with the provided API key
-   llm = OpenAI(openai_api_key=openai_api_key)
-   
-   # Create a template for the prompt with instructions for the AI
-   # This template defines what we want the AI to generate
-   template = """
-   As experienced startup and venture capital writer, 
-   generate a 400-word blog post about {topic}
-   
-   Your response should be in this format:
-   First, print the blog post.
-   Then, sum the total number of words on it and print the result like this: This post has X words.
-   """
-   
-   # Create a PromptTemplate object that allows inserting the topic into the template
-   prompt = PromptTemplate(
-       input_variables=["topic"],  # Variables that can be inserted into the template
-       template=template  # The template string defined above
-   )
+   # Get the OpenAI language model for the provided API key
+   with span("load_llm"):
+       llm = load_LLM(openai_api_key)
    
    # Format the prompt by inserting the actual topic
-   query = prompt.format(topic=topic)
+   # (the prompt template lives in common/pipelines.py)
+   query = format_blog_prompt(topic)
+   
+   if STREAM_RESPONSE:
+       # Stream the blog post into the page as tokens arrive
+       # Sessions asking for the same topic at the same time share one OpenAI call
+       stream = TimedStream(stream_completion(llm, query))
+       st.write_stream(stream)
+       
+       # Show how long the user waited for the first token and the full post
+       return st.caption(stream.summary())
    
    # Call the language model with the formatted prompt
    # Using invoke() method (current recommended approach) instead of the deprecated __call__
-   # max_tokens limits the response length to 2048 tokens
-   response = llm.invoke(query, max_tokens=2048)
+   # Sessions asking for the same topic at the same time share one OpenAI call
+   response = coalesced_invoke(llm, query)
    
    # Display the response in the Streamlit app
    return st.write(response)
@@ -59,5 +78,17 @@ if not openai_api_key.startswith("sk-"):
    # Show a warning if the API key is missing or invalid
    st.warning("Enter OpenAI API Key")
 elif topic_text:  # Only proceed if the user has entered a topic
+   # Import the request helpers now that there is a topic (generate_response uses them)
+   from common.coalescing import coalesced_invoke  # Sharing identical in-flight requests between sessions
+   from common.streaming import TimedStream, stream_completion  # Token streaming helpers
+   from common.tracing import span, trace  # Per-request latency breakdown
+
    # Call the generate_response function with the user's topic
-   generate_response(topic_text)
\ No newline at end of file
+   # Every stage of the request is timed (and exported when LLM_TRACE_PATH is set)
+   with trace("blog_post") as request_trace:
+       generate_response(topic_text)
+   
+   # Show where the time of this request went
+   if SHOW_LATENCY_PANEL:
+       with st.expander("Latency breakdown"):
+           st.dataframe(request_trace.rows(), hide_index=True)
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""Batch mode: summarize every text file of a directory or glob to JSONL.
+
+Each file goes through the same pipeline as the page: it is read line by
+line, split into token-sized chunks as it is read and summarized with the
+concurrent map_reduce. Several files are summarized at once, on threads or
+on processes, and each summary is appended to the output file as one JSON
+line as soon as it is ready.
+
+A checkpoint manifest (by default the output path with ``.manifest.jsonl``)
+records the content hash of every file that was summarized or failed.
+Running the same command again skips the files already summarized and
+unchanged since, so an interrupted or partially failed run can simply be
+started again to resume. Throughput (documents and tokens per second) is
+printed at the end.
+
+Usage:
+    export OPENAI_API_KEY=sk-...
+    python batch.py docs/ summaries.jsonl --workers 4 --concurrency 4
+    python batch.py "corpus/**/*.txt" summaries.jsonl --executor process --workers 8
+    python batch.py docs/ summaries.jsonl --fake-latency 0.2  # local stand-in LLM, no API key needed
+"""
+import argparse  # For parsing command-line options
+import glob  # For expanding glob patterns
+import hashlib  # For the content hashes of the manifest
+import json  # For writing the JSONL output and manifest
+import os  # For reading the API key from the environment
+import sys  # For making the shared helpers importable
+import time  # For measuring throughput
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache  # For building the LLM once per process
+from pathlib import Path  # For locating files
+from typing import Dict, Iterable, List, Optional
+
+# Make the shared helpers in the repository root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Same limits as the page
+MAX_WORDS = 1000000
+TOKEN_BUDGET = 3000000
+
+
+def find_files(inputs: Iterable[str], pattern: str = "*.txt") -> List[Path]:
+    """Return the files named by ``inputs``: files, directories (searched recursively) or globs."""
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.update(match for match in path.rglob(pattern) if match.is_file())
+        elif path.is_file():
+            files.add(path)
+        else:
+            files.update(Path(match) for match in glob.glob(item, recursive=True) if Path(match).is_file())
+    return sorted(file.resolve() for file in files)
+
+
+def file_hash(path: Path) -> str:
+    """Return the SHA-256 of a file's content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(path: Path) -> Dict[str, dict]:
+    """Return the last manifest entry of every file, keyed on path."""
+    if not path.exists():
+        return {}
+    entries = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+                entries[entry["path"]] = entry
+            except (ValueError, KeyError):
+                continue  # Ignore a line truncated by an interrupted run
+    return entries
+
+
+@lru_cache(maxsize=None)
+def load_llm(fake_latency: Optional[float] = None):
+    """Build the summarization LLM of this process (OpenAI, or the local stand-in)."""
+    from common.pipelines import LLM_SETTINGS, build_llm  # LLM settings shared with the page
+
+    if fake_latency is None:
+        return build_llm("summarize", os.environ["OPENAI_API_KEY"])
+
+    from common.cache import with_response_cache
+    from common.fake_llm import FakeLLM
+    from common.tracing import with_tracing
+
+    return with_tracing(with_response_cache(FakeLLM(latency=fake_latency, **LLM_SETTINGS["summarize"])))
+
+
+@lru_cache(maxsize=None)
+def load_text_splitter(fake_latency: Optional[float] = None):
+    """Build the token-aware text splitter of this process (as the page does)."""
+    from common.chunking import token_text_splitter
+
+    return token_text_splitter(load_llm(fake_latency))
+
+
+def summarize_file(path: str, max_concurrency: int = 4, fake_latency: Optional[float] = None) -> dict:
+    """Summarize one file with the page's pipeline and return its output record.
+
+    Runs in a worker thread or process. The record holds the summary and the
+    chunks, words and LLM tokens the file took.
+    """
+    from common.ingest import count_words, read_lines, split_stream
+    from common.map_reduce import concurrent_map_reduce
+    from common.tracing import trace
+
+    llm = load_llm(fake_latency)
+    start = time.perf_counter()
+    with open(path, "rb") as file:
+        words = count_words(read_lines(file))
+        if words > MAX_WORDS:
+            raise ValueError(f"the file is longer than {MAX_WORDS} words")
+        # Every LLM call of the file is recorded on its trace, with the tokens it used
+        with trace("summarize_file", path=path, words=words) as file_trace:
+            summary = ""
+            if words:
+                documents = split_stream(load_text_splitter(fake_latency), read_lines(file))
+                summary = concurrent_map_reduce(
+                    llm, documents, max_concurrency=max_concurrency, token_budget=TOKEN_BUDGET
+                )
+
+    calls = [recorded.attributes for recorded in file_trace.spans if recorded.name == "llm"]
+    map_span = next((recorded for recorded in file_trace.spans if recorded.name == "map"), None)
+    return {
+        "path": path,
+        "summary": summary,
+        "words": words,
+        "chunks": map_span.attributes.get("chunks", 0) if map_span else 0,
+        "llm_calls": len(calls),
+        "prompt_tokens": sum(call.get("prompt_tokens", 0) for call in calls),
+        "completion_tokens": sum(call.get("completion_tokens", 0) for call in calls),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def run_batch(
+    files: Iterable[Path],
+    output_path: Path,
+    manifest_path: Path,
+    workers: int = 4,
+    max_concurrency: int = 4,
+    executor: str = "thread",
+    fake_latency: Optional[float] = None,
+) -> Dict[str, float]:
+    """Summarize every file not yet done according to the manifest and append the results.
+
+    At most ``workers`` files are summarized at once, on threads or processes
+    (``executor``), each with up to ``max_concurrency`` map calls in flight.
+    A summary is written before its manifest entry, so an interrupted run
+    never skips a file whose summary is missing; a file summarized again
+    after a crash can appear twice in the output, the last line wins.
+    Failed files are recorded as such and retried by the next run.
+    """
+    manifest = read_manifest(manifest_path)
+    stats = {"summarized": 0, "skipped": 0, "failed": 0, "words": 0, "tokens": 0}
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    start = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as output, \
+            open(manifest_path, "a", encoding="utf-8") as checkpoints, \
+            pool_class(max_workers=workers) as pool:
+        pending = {}
+
+        def record(path: str, digest: str, status: str, error: Optional[str] = None) -> None:
+            entry = {"path": path, "sha256": digest, "status": status}
+            if error is not None:
+                entry["error"] = error
+            checkpoints.write(json.dumps(entry) + "\n")
+            checkpoints.flush()
+
+        def collect(futures):
+            for future in futures:
+                path, digest = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as error:  # Any failure only fails this file
+                    print(f"{path} failed: {type(error).__name__}: {error}", file=sys.stderr)
+                    record(path, digest, "failed", f"{type(error).__name__}: {error}")
+                    stats["failed"] += 1
+                    continue
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                record(path, digest, "done")
+                stats["summarized"] += 1
+                stats["words"] += result["words"]
+                stats["tokens"] += result["prompt_tokens"] + result["completion_tokens"]
+
+        for file in files:
+            path, digest = str(file), file_hash(file)
+            done = manifest.get(path)
+            if done is not None and done["status"] == "done" and done["sha256"] == digest:
+                stats["skipped"] += 1
+                continue
+            # Wait for a free worker before submitting the next file
+            while len(pending) >= workers:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending[pool.submit(summarize_file, path, max_concurrency, fake_latency)] = path, digest
+        collect(list(pending))
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = elapsed
+    for key, total in (("docs", stats["summarized"]), ("tokens", stats["tokens"]), ("words", stats["words"])):
+        stats[f"{key}_per_second"] = total / elapsed if elapsed else 0.0
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Summarize every text file of a directory or glob to JSONL.")
+    parser.add_argument("inputs", nargs="+", help="text files, directories or glob patterns (quote them)")
+    parser.add_argument("output", type=Path, help="JSONL file the summaries are appended to")
+    parser.add_argument("--pattern", default="*.txt", help="files looked for in directories")
+    parser.add_argument("--manifest", type=Path, help="checkpoint manifest (default: OUTPUT.manifest.jsonl)")
+    parser.add_argument("--workers", type=int, default=4, help="files summarized at once")
+    parser.add_argument("--concurrency", type=int, default=4, help="map calls in flight per file")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="run the workers on threads or on processes")
+    parser.add_argument("--fake-latency", type=float, help="use a local stand-in LLM with this latency instead of OpenAI")
+    args = parser.parse_args(argv)
+
+    manifest = args.manifest or args.output.with_suffix(".manifest.jsonl")
+    files = find_files(args.inputs, args.pattern)
+    stats = run_batch(files, args.output, manifest, args.workers, args.concurrency, args.executor, args.fake_latency)
+    print(f"summarized: {stats['summarized']}, already done: {stats['skipped']}, failed: {stats['failed']}")
+    print(
+        f"{stats['seconds']:.1f}s: {stats['docs_per_second']:.2f} docs/s, "
+        f"{stats['tokens_per_second']:.0f} tokens/s (prompt + completion), {stats['words_per_second']:.0f} words/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,57 @@
 # Import necessary libraries
 import streamlit as st  # For building the web interface
-from langchain_core.prompts import PromptTemplate  # For creating structured prompts
-from langchain_openai import OpenAI  # OpenAI LLM integration
-from langchain.chains.summarize import load_summarize_chain  # Summarization chain
-from langchain.text_splitter import RecursiveCharacterTextSplitter  # For splitting long texts
-import pandas as pd  # For data manipulation (though not used directly in this app)
-from io import StringIO  # For handling text file uploads
+import sys  # For making the shared helpers importable
+from pathlib import Path  # For locating the repository root
+
+# Make the shared helpers in the repository root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.clients import CLIENT_TTL, MAX_CACHED_CLIENTS  # Limits of the cached OpenAI clients
+from common.pipelines import build_llm  # LLM settings shared with the HTTP service
+# Heavy helpers (LangChain, OpenAI) are imported below, once a request is submitted,
+# so the page renders its inputs without waiting for them
+
+# Maximum number of chunk summaries requested from OpenAI at the same time
+MAX_CONCURRENCY = 4
+
+# Maximum file length in words (summaries are reduced as a tree, so book-length files are fine)
+MAX_WORDS = 1000000
+
+# Maximum tokens (prompts and completions) spent on one file, to cap the cost of a run
+TOKEN_BUDGET = 3000000
+
+# Render the final summary token by token as it is generated
+STREAM_RESPONSE = True
+
+# Show the summary of each chunk as soon as it is ready, while the others are being summarized
+SHOW_CHUNK_SUMMARIES = True
+
+# Show a table with the time spent in each stage of the request below the summary
+SHOW_LATENCY_PANEL = False
 
 # Function to initialize the OpenAI LLM with API key
+# Cached so the client is built once per API key and reused by every rerun and session
+@st.cache_resource(max_entries=MAX_CACHED_CLIENTS, ttl=CLIENT_TTL)
 def load_LLM(openai_api_key):
-   # Create an OpenAI LLM instance with temperature=0 (more deterministic outputs)
-   llm = OpenAI(temperature=0, openai_api_key=openai_api_key)
-   return llm
+   # OpenAI LLM with temperature=0 (more deterministic outputs), the shared HTTP client,
+   # the response cache (chunks and documents already summarized are answered from it) and tracing
+   return build_llm("summarize", openai_api_key)
+
+# Function to get the chunk summary store shared by all sessions
+# Re-uploading a slightly edited file only summarizes the chunks that changed
+@st.cache_resource
+def get_summary_store():
+   from common.map_reduce import ChunkSummaryStore  # Chunk summaries kept between runs
+   return ChunkSummaryStore()
+
+# Function to initialize the text splitter that breaks long text into manageable chunks
+# Chunks are measured in tokens, fit what the model can take and end on paragraphs picked by their
+# content, so editing a paragraph only changes its own chunk
+# Cached per model (model_params, without the API key) so it is built once instead of on every
+# rerun; the splitter counts tokens with the model's tokenizer and keeps no reference to _llm
+@st.cache_resource
+def load_text_splitter(_llm, model_params):
+   from common.chunking import token_text_splitter  # Token-aware text splitting
+   return token_text_splitter(_llm)
 
 # Configure the Streamlit page
 st.set_page_config(page_title="AI Long Text Summarizer")  # Set browser tab title
@@ -55,25 +95,24 @@ st.markdown("### Here is your Summary:")
 
 # Only process if a file has been uploaded
 if uploaded_file is not None:
-   # Read the uploaded file as bytes
-   bytes_data = uploaded_file.getvalue()
-   
-   # Convert the bytes to a string using StringIO
-   stringio = StringIO(uploaded_file.getvalue().decode("utf-8"))
-   
-   # Read the content as a string
-   string_data = stringio.read()
-   
-   # Store the file content for processing
-   file_input = string_data
-
-   # Check if the file is too large (word count > 20000)
-   if len(file_input.split(" ")) > 20000:
-       st.write("Please enter a shorter file. The maximum length is 20000 words.")
+   # Import the request helpers now that there is a file to summarize
+   from common.ingest import count_words, read_lines, split_stream  # Incremental upload ingestion
+   from common.map_reduce import IncompleteSummaryError, concurrent_map_reduce  # Concurrent map_reduce summarization
+   from common.scheduler import TokenBudgetExceeded  # Per-document token budget
+   from common.streaming import TimedStream  # Time to first token of the final summary
+   from common.tracing import span, trace  # Per-request latency breakdown
+
+   # Count the words while decoding the uploaded file line by line
+   # (the whole file is never copied into a single string)
+   word_count = count_words(read_lines(uploaded_file))
+
+   # Check if the file is too large (word count > MAX_WORDS)
+   if word_count > MAX_WORDS:
+       st.write(f"Please enter a shorter file. The maximum length is {MAX_WORDS} words.")
        st.stop()  # Stop execution if file is too large
 
    # Check if we have both file content and API key
-   if file_input:
+   if word_count:
        if not openai_api_key:
            # Show warning if API key is missing
            st.warning('Please insert OpenAI API Key. \
@@ -81,28 +120,85 @@ if uploaded_file is not None:
            icon="⚠️")
            st.stop()  # Stop execution if API key is missing
 
-   # Initialize text splitter to break long text into manageable chunks
-   text_splitter = RecursiveCharacterTextSplitter(
-       separators=["\n\n", "\n"],  # Split on paragraph and line breaks
-       chunk_size=5000,  # Each chunk will be approximately 5000 characters
-       chunk_overlap=350  # Overlap between chunks to maintain context
-   )
-
-   # Split the input text into documents (chunks)
-   splitted_documents = text_splitter.create_documents([file_input])
-
-   # Initialize the LLM with the API key
-   llm = load_LLM(openai_api_key=openai_api_key)
-
-   # Create a summarization chain using the map_reduce approach
-   # map_reduce first summarizes each chunk, then summarizes those summaries
-   summarize_chain = load_summarize_chain(
-       llm=llm, 
-       chain_type="map_reduce"  # Use map_reduce for efficient handling of multiple chunks
-   )
-
-   # Run the summarization chain on the split documents
-   summary_output = summarize_chain.run(splitted_documents)
-
-   # Display the summary result
-   st.write(summary_output)
\ No newline at end of file
+   # Button stopping a long summarization: clicking it interrupts the run in progress,
+   # which stops its outstanding OpenAI calls, and this rerun does not start it again
+   if st.button("Cancel"):
+       st.info("Summarization cancelled. The chunks already summarized are kept, "
+               "so summarizing this file again resumes where it stopped.")
+       st.button("Summarize again")  # Any click reruns the page without cancelling
+       st.stop()
+
+   # Progress of the map phase and the summary of each chunk as it completes
+   progress = st.progress(0.0, text="Summarizing the chunks...")
+   summary_area = st.container()  # The final summary is written here, above the chunk summaries
+   if SHOW_CHUNK_SUMMARIES:
+       chunk_area = st.expander("Chunk summaries", expanded=True)
+   map_progress = {"chunks": 0, "words": 0}
+
+   # Function called as each chunk summary completes (in the script thread, so it can update the page)
+   def show_chunk(index, doc, summary):
+       map_progress["chunks"] += 1
+       map_progress["words"] += len(doc.page_content.split())
+       # Chunks do not overlap, so their words add up to the word count (a word cut in two counts twice)
+       done = min(map_progress["words"] / word_count, 1.0)
+       progress.progress(done, text=f"Summarized {map_progress['chunks']} chunks ({done:.0%} of the file)")
+       if SHOW_CHUNK_SUMMARIES:
+           chunk_area.markdown(f"**Chunk {index + 1}:** {summary}")
+
+   # Function streaming the final summary into the page as its tokens arrive
+   def write_summary(tokens):
+       progress.progress(1.0, text=f"Combining the summaries of {map_progress['chunks']} chunks...")
+       stream = TimedStream(tokens)
+       text = summary_area.write_stream(stream)
+       progress.progress(1.0, text=f"Summarized {map_progress['chunks']} chunks. {stream.summary()}")
+       return text
+
+   # Time every stage of the request (exported when LLM_TRACE_PATH is set)
+   with trace("summarize_file", words=word_count) as request_trace:
+       # Initialize the LLM with the API key
+       with span("load_llm"):
+           llm = load_LLM(openai_api_key=openai_api_key)
+
+       # Get the text splitter that breaks long text into manageable chunks
+       with span("load_text_splitter"):
+           text_splitter = load_text_splitter(llm, llm.dict())
+
+       # Split the uploaded file into documents (chunks) as it is read
+       # This is a generator: chunks are produced only as fast as they are summarized
+       # (the time spent splitting is recorded as split_ms on the map span)
+       splitted_documents = split_stream(text_splitter, read_lines(uploaded_file))
+
+       # Summarize the split documents using the map_reduce approach
+       # map_reduce first summarizes each chunk (concurrently), then summarizes those summaries
+       # When there are too many summaries for one prompt, they are reduced in groups, level by level
+       # Rate-limited or timed-out calls are retried chunk by chunk (see common/scheduler.py)
+       # If the run is interrupted (Cancel, Stop or a rerun), the calls not yet made are dropped
+       with span("map_reduce"):
+           try:
+               summary_output = concurrent_map_reduce(
+                   llm,
+                   splitted_documents,
+                   max_concurrency=MAX_CONCURRENCY,  # Limit the number of chunks summarized at once
+                   summary_store=get_summary_store(),  # Reuse summaries of unchanged chunks
+                   token_budget=TOKEN_BUDGET,  # Stop before the file costs more than this
+                   on_chunk=show_chunk,  # Show progress and chunk summaries as they complete
+                   write_final=write_summary if STREAM_RESPONSE else None  # Stream the final summary
+               )
+           except IncompleteSummaryError as error:
+               # The finished chunks are in the summary store, so a retry only redoes the failed ones
+               st.error(f"{error} Upload the file again to retry the failed chunks.")
+               st.stop()
+           except TokenBudgetExceeded as error:
+               st.error(f"This file is too expensive to summarize: {error}.")
+               st.stop()
+
+       # Display the summary result (already rendered while streaming)
+       if not STREAM_RESPONSE:
+           with span("render"):
+               progress.progress(1.0, text=f"Summarized {map_progress['chunks']} chunks")
+               summary_area.write(summary_output)
+
+   # Show where the time of this request went
+   if SHOW_LATENCY_PANEL:
+       with st.expander("Latency breakdown"):
+           st.dataframe(request_trace.rows(), hide_index=True)
\ No newline at end of file
@@ -1,36 +1,79 @@
 # Import necessary libraries
 import streamlit as st  # For building the web interface
-from langchain_openai import OpenAI  # OpenAI LLM integration
-from langchain.docstore.document import Document  # Document representation for LangChain
-from langchain.text_splitter import CharacterTextSplitter  # For splitting text into chunks
-from langchain.chains.summarize import load_summarize_chain  # Summarization chain from LangChain
+import sys  # For making the shared helpers importable
+from pathlib import Path  # For locating the repository root
+
+# Make the shared helpers in the repository root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.clients import CLIENT_TTL, MAX_CACHED_CLIENTS  # Limits of the cached OpenAI clients
+from common.pipelines import build_llm, summarize_text  # Summarization pipeline shared with the HTTP service
+# Heavy helpers (LangChain, OpenAI) are imported below, once a request is submitted,
+# so the page renders its inputs without waiting for them
+
+# Maximum number of chunk summaries requested from OpenAI at the same time
+MAX_CONCURRENCY = 4
+
+# Maximum tokens (prompts and completions) spent on one text, to cap the cost of a run
+TOKEN_BUDGET = 1000000
+
+# Before summarizing a long text, keep only its most salient sentences (scored locally)
+# holding this fraction of the words, e.g. 0.5 to send about half the tokens (None: off)
+PREFILTER_RATIO = None
+
+# Texts up to this many words are always sent whole
+PREFILTER_MIN_WORDS = 3000
+
+# Show a table with the time spent in each stage of the request below the summary
+SHOW_LATENCY_PANEL = False
+
+# Function to initialize the OpenAI LLM with the provided API key
+# Cached so the client is built once per API key and reused by every rerun and session
+@st.cache_resource(max_entries=MAX_CACHED_CLIENTS, ttl=CLIENT_TTL)
+def load_LLM(openai_api_key):
+   # OpenAI LLM with temperature 0 (deterministic output), the shared HTTP client,
+   # the response cache (chunks and texts already summarized are answered from it) and tracing
+   return build_llm("summarize", openai_api_key)
+
+# Function to get the chunk summary store shared by all sessions
+# When some chunks fail (e.g. rate limited), submitting again only redoes those
+@st.cache_resource
+def get_summary_store():
+   from common.map_reduce import ChunkSummaryStore  # Chunk summaries kept between runs
+   return ChunkSummaryStore()
+
+# Function to initialize the text splitter that breaks long text into manageable chunks
+# Chunks are measured in tokens, fit what the model can take and end on paragraphs picked by their
+# content, so editing a paragraph only changes its own chunk
+# Cached per model (model_params, without the API key) so it is built once instead of on every
+# rerun; the splitter counts tokens with the model's tokenizer and keeps no reference to _llm
+@st.cache_resource
+def load_text_splitter(_llm, model_params):
+   from common.chunking import token_text_splitter  # Token-aware text splitting
+   return token_text_splitter(_llm)
 
 # Define function to generate summary response
 def generate_response(txt):
-   # Initialize OpenAI language model with the provided API key and temperature 0 (deterministic output)
-   llm = OpenAI(
-       temperature=0,
-       openai_api_key=openai_api_key
-   )
-   
-   # Initialize text splitter to break long text into manageable chunks
-   text_splitter = CharacterTextSplitter()  # Using default parameters
-   
-   # Split the input text into multiple chunks
-   texts = text_splitter.split_text(txt)
+   # Get the OpenAI language model for the provided API key
+   with span("load_llm"):
+       llm = load_LLM(openai_api_key)
    
-   # Convert each text chunk into a Document object that LangChain can process
-   docs = [Document(page_content=t) for t in texts]
+   # Get the text splitter that breaks long text into manageable chunks
+   with span("load_text_splitter"):
+       text_splitter = load_text_splitter(llm, llm.dict())
    
-   # Initialize the summarization chain with the map_reduce approach
-   # map_reduce first summarizes each chunk, then summarizes those summaries
-   chain = load_summarize_chain(
+   # Split the input text into chunks and run the map_reduce summarization
+   # map_reduce first summarizes each chunk (concurrently), then summarizes those summaries
+   # Rate-limited or timed-out calls are retried chunk by chunk (see common/scheduler.py)
+   return summarize_text(
        llm,
-       chain_type="map_reduce"
+       txt,
+       max_concurrency=MAX_CONCURRENCY,  # Limit the number of chunks summarized at once
+       text_splitter=text_splitter,
+       summary_store=get_summary_store(),  # Keep finished chunks if others fail
+       token_budget=TOKEN_BUDGET,  # Stop before the text costs more than this
+       # Drop the least salient sentences of long texts before the map phase
+       prefilter_ratio=PREFILTER_RATIO if len(txt.split()) > PREFILTER_MIN_WORDS else None
    )
-   
-   # Run the summarization chain and return the result
-   return chain.run(docs)
 
 # Configure the Streamlit page
 st.set_page_config(
@@ -66,8 +109,23 @@ with st.form("summarize_form", clear_on_submit=True):  # clear_on_submit resets
    
    # Process the submission if form is submitted and API key is valid
    if submitted and openai_api_key.startswith("sk-"):
-       # Generate the summary
-       response = generate_response(txt_input)
+       # Import the request helpers now that a text was submitted (generate_response uses them)
+       from common.map_reduce import IncompleteSummaryError  # Raised when some chunks failed
+       from common.scheduler import TokenBudgetExceeded  # Per-text token budget
+       from common.tracing import span, trace  # Per-request latency breakdown
+
+       # Generate the summary, timing every stage of the request
+       # (exported when LLM_TRACE_PATH is set)
+       with trace("summarize_text", characters=len(txt_input)) as request_trace:
+           try:
+               response = generate_response(txt_input)
+           except IncompleteSummaryError as error:
+               # The finished chunks are kept, so submitting again only redoes the failed ones
+               st.error(f"{error} Submit again to retry the failed chunks.")
+               st.stop()
+           except TokenBudgetExceeded as error:
+               st.error(f"This text is too expensive to summarize: {error}.")
+               st.stop()
        
        # Add the response to the results list
        result.append(response)
@@ -78,4 +136,9 @@ with st.form("summarize_form", clear_on_submit=True):  # clear_on_submit resets
 # Display the result if there is one
 if len(result):
    # Show the summary in an info box
-   st.info(response)
\ No newline at end of file
+   st.info(response)
+   
+   # Show where the time of this request went
+   if SHOW_LATENCY_PANEL:
+       with st.expander("Latency breakdown"):
+           st.dataframe(request_trace.rows(), hide_index=True)
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""Batch mode: extract key information from a CSV/JSONL file of reviews.
+
+Several reviews are packed into each request and the requests are sent
+concurrently. Every answer is parsed into the sentiment / delivery_days /
+price_perception schema and written as one JSON line per review. Reviews
+already present in the output file are skipped, so an interrupted or
+partially failed run can simply be started again to resume. With
+--near-duplicate-threshold, a review nearly identical to one extracted
+earlier in the run reuses its answer instead of being sent.
+
+Usage:
+    export OPENAI_API_KEY=sk-...
+    python batch.py reviews.csv extracted.jsonl --batch-size 10 --concurrency 4
+    python batch.py reviews.csv extracted.jsonl --near-duplicate-threshold 0.9
+"""
+import argparse  # For parsing command-line options
+import csv  # For reading CSV review files
+import json  # For reading and writing JSONL files
+import os  # For reading the API key from the environment
+import sys  # For making the shared helpers importable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice  # For packing reviews into batches
+from pathlib import Path  # For locating files
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+
+# Make the shared helpers in the repository root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.cache import with_response_cache  # noqa: E402  Persistent LLM response cache
+from common.near_duplicates import NearDuplicateIndex  # noqa: E402  Reusing answers of near-identical reviews
+from common.scheduler import get_scheduler  # noqa: E402  Rate limits and retries of every call
+
+# Same extraction rules as the single-review page, but answered as JSON
+batch_template = """\
+For each of the following reviews, extract the following information:
+
+sentiment: Is the customer happy with the product? \
+Answer Positive if yes, Negative if not, Neutral if either of them, \
+or Unknown if unknown.
+
+delivery_days: How many days did it take for the product to arrive? \
+Answer with a number, or null if this information is not found.
+
+price_perception: How does it feel the customer about the price? \
+Answer Expensive if the customer feels the product is expensive, \
+Cheap if the customer feels the product is cheap, Neutral if either of them, \
+or Unknown if unknown.
+
+Format the output as a JSON list with one object per review, in the same \
+order, with the keys "id", "sentiment", "delivery_days" and "price_perception".
+
+Input example:
+[r1] This dress is pretty amazing. It arrived in two days, just in time for my wife's anniversary present. It is cheaper than the other dresses out there, but I think it is worth it for the extra features.
+
+Output example:
+[{{"id": "r1", "sentiment": "Positive", "delivery_days": 2, "price_perception": "Cheap"}}]
+
+Reviews:
+{reviews}
+"""
+
+batch_prompt = PromptTemplate(input_variables=["reviews"], template=batch_template)
+
+SENTIMENTS = {"Positive", "Negative", "Neutral", "Unknown"}
+PRICE_PERCEPTIONS = {"Expensive", "Cheap", "Neutral", "Unknown"}
+
+
+def read_reviews(path: Path, text_column: str = "review", id_column: str = "id") -> Iterator[Tuple[str, str]]:
+    """Yield ``(id, review)`` pairs from a CSV or JSONL file.
+
+    Rows without an ``id_column`` are identified by their position in the file.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            rows = (json.loads(line) for line in file if line.strip())
+        else:
+            rows = csv.DictReader(file)
+        for position, row in enumerate(rows, start=1):
+            review = (row.get(text_column) or "").strip()
+            if review:
+                yield str(row.get(id_column) or position), review
+
+
+def read_done_ids(path: Path) -> set:
+    """Return the ids already written to a previous run's output file."""
+    if not path.exists():
+        return set()
+    done = set()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError):
+                continue  # Ignore a line truncated by an interrupted run
+    return done
+
+
+def normalize(record: dict) -> dict:
+    """Coerce one parsed answer into the output schema."""
+    sentiment = str(record.get("sentiment", "")).strip().capitalize()
+    price = str(record.get("price_perception", "")).strip().capitalize()
+    try:
+        delivery_days = int(record.get("delivery_days"))
+    except (TypeError, ValueError):
+        delivery_days = None
+    return {
+        "id": str(record["id"]),
+        "sentiment": sentiment if sentiment in SENTIMENTS else "Unknown",
+        "delivery_days": delivery_days,
+        "price_perception": price if price in PRICE_PERCEPTIONS else "Unknown",
+    }
+
+
+def extract_batch(llm: BaseLanguageModel, batch: List[Tuple[str, str]]) -> Dict[str, dict]:
+    """Extract the key information of a batch of reviews with one request.
+
+    Returns the parsed records keyed on review id. Reviews the model skipped
+    or answered with an unknown id are missing from the result. The request
+    goes through the shared scheduler, which keeps under the rate limits and
+    retries rate-limited or timed-out calls. An answer that is not a JSON
+    list (or a single object) raises ``OutputParserException``.
+    """
+    # Keep each review on a single line so the ids stay unambiguous
+    reviews = "\n".join(f"[{review_id}] {' '.join(text.split())}" for review_id, text in batch)
+    output = get_scheduler().invoke(llm, batch_prompt.format(reviews=reviews))
+    parsed = JsonOutputParser().parse(output)
+    if isinstance(parsed, dict):
+        parsed = [parsed]
+    if not isinstance(parsed, list):
+        raise OutputParserException(f"Expected a JSON list of records, got {type(parsed).__name__}", llm_output=output)
+
+    wanted = {review_id for review_id, _ in batch}
+    records = {}
+    for record in parsed:
+        if isinstance(record, dict) and str(record.get("id")) in wanted:
+            records[str(record["id"])] = normalize(record)
+    return records
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Split ``items`` into lists of at most ``size`` elements."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def run_batch(
+    llm: BaseLanguageModel,
+    reviews: Iterable[Tuple[str, str]],
+    output_path: Path,
+    batch_size: int = 10,
+    max_concurrency: int = 4,
+    duplicates: Optional[NearDuplicateIndex] = None,
+) -> Dict[str, int]:
+    """Extract every review not yet in ``output_path`` and append the results.
+
+    At most ``max_concurrency`` batches are in flight; rows are written and
+    flushed as soon as their batch completes. A batch whose answer cannot be
+    parsed or whose request still fails after the scheduler's retries is
+    counted as failed and left out of the output, so the next run retries
+    it; the other batches carry on. With a
+    ``duplicates`` index, reviews nearly identical to one already extracted
+    are written with its answer instead of being sent.
+    """
+    done = read_done_ids(output_path)
+    todo = ((review_id, text) for review_id, text in reviews if review_id not in done)
+    stats = {"skipped": len(done), "written": 0, "reused": 0, "failed": 0}
+
+    with open(output_path, "a", encoding="utf-8") as output, ThreadPoolExecutor(max_concurrency) as pool:
+        pending = {}
+
+        def to_send():
+            for review_id, text in todo:
+                match = duplicates.lookup(text) if duplicates is not None else None
+                if match is None:
+                    yield review_id, text
+                    continue
+                output.write(json.dumps({"id": review_id, **match[0]}) + "\n")
+                stats["written"] += 1
+                stats["reused"] += 1
+
+        def collect(futures):
+            for future in futures:
+                batch = pending.pop(future)
+                try:
+                    records = future.result()
+                except Exception as error:  # Unparsable answers and calls out of retries only fail this batch
+                    print(f"Batch starting at {batch[0][0]} failed: {type(error).__name__}: {error}", file=sys.stderr)
+                    records = {}
+                for review_id, text in batch:
+                    if review_id in records:
+                        output.write(json.dumps(records[review_id]) + "\n")
+                        stats["written"] += 1
+                        if duplicates is not None:
+                            duplicates.add(text, {k: v for k, v in records[review_id].items() if k != "id"})
+                    else:
+                        stats["failed"] += 1
+                output.flush()
+
+        for batch in batched(to_send(), batch_size):
+            # Wait for a free slot before sending the next batch
+            if len(pending) >= max_concurrency:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending[pool.submit(extract_batch, llm, batch)] = batch
+        collect(list(pending))
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Extract key information from a file of product reviews.")
+    parser.add_argument("input", type=Path, help="CSV or JSONL file with one review per row")
+    parser.add_argument("output", type=Path, help="JSONL file the results are appended to")
+    parser.add_argument("--text-column", default="review", help="column holding the review text")
+    parser.add_argument("--id-column", default="id", help="column holding the review id")
+    parser.add_argument("--batch-size", type=int, default=10, help="reviews packed into each request")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--near-duplicate-threshold", type=float,
+                        help="reuse the answer of an earlier review at least this similar (0-1)")
+    parser.add_argument("--near-duplicate-max-entries", type=int, default=10000,
+                        help="extracted reviews remembered for --near-duplicate-threshold")
+    args = parser.parse_args(argv)
+
+    from langchain_openai import OpenAI  # OpenAI LLM integration
+
+    # A batch of JSON answers needs more room than the default 256 tokens
+    # The client does not retry on its own: the scheduler retries every call
+    llm = with_response_cache(
+        OpenAI(temperature=0, max_tokens=1024, max_retries=0, openai_api_key=os.environ["OPENAI_API_KEY"])
+    )
+    reviews = read_reviews(args.input, args.text_column, args.id_column)
+    duplicates = None
+    if args.near_duplicate_threshold is not None:
+        duplicates = NearDuplicateIndex(args.near_duplicate_threshold, args.near_duplicate_max_entries)
+    stats = run_batch(llm, reviews, args.output, args.batch_size, args.concurrency, duplicates)
+    print(f"written: {stats['written']} (reused: {stats['reused']}), "
+          f"already done: {stats['skipped']}, failed: {stats['failed']}")
+    if duplicates is not None:
+        print(f"near-duplicate index: {duplicates.stats()}")
+
+
+if __name__ == "__main__":
+    main()
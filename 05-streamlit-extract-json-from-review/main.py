@@ -1,56 +1,47 @@
 # Import necessary libraries
 import streamlit as st  # For building the web interface
-from langchain_core.prompts import PromptTemplate  # For creating structured prompts
-from langchain_openai import OpenAI  # OpenAI LLM integration
-
-# Define the template for extracting key information from product reviews
-# This template provides instructions for the AI to extract sentiment, delivery time, and price perception
-template = """\
-For the following text, extract the following \
-information:
-
-sentiment: Is the customer happy with the product? 
-Answer Positive if yes, Negative if \
-not, Neutral if either of them, or Unknown if unknown.
-
-delivery_days: How many days did it take \
-for the product to arrive? If this \
-information is not found, output No information about this.
-
-price_perception: How does it feel the customer about the price? 
-Answer Expensive if the customer feels the product is expensive, 
-Cheap if the customer feels the product is cheap,
-not, Neutral if either of them, or Unknown if unknown.
-
-Format the output as bullet-points text with the \
-following keys:
-- Sentiment
-- How long took it to deliver?
-- How was the price perceived?
-
-Input example:
-This dress is pretty amazing. It arrived in two days, just in time for my wife's anniversary present. It is cheaper than the other dresses out there, but I think it is worth it for the extra features.
-
-Output example:
-- Sentiment: Positive
-- How long took it to deliver? 2 days
-- How was the price perceived? Cheap
-
-text: {review}
-"""
-
-# Create a PromptTemplate with a variable for the review text
-prompt = PromptTemplate(
-   input_variables=["review"],  # Variable to be inserted into the template
-   template=template,  # The template string defined above
-)
+import sys  # For making the shared helpers importable
+from pathlib import Path  # For locating the repository root
+
+# Make the shared helpers in the repository root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.clients import CLIENT_TTL, MAX_CACHED_CLIENTS  # Limits of the cached OpenAI clients
+from common.pipelines import MAX_INPUT_WORDS, build_llm, format_review_prompt  # Prompt and LLM logic
+# Heavy helpers (LangChain, OpenAI) are imported below, once a request is submitted,
+# so the page renders its inputs without waiting for them
+
+# Render the extracted data token by token as it is generated
+STREAM_RESPONSE = True
+
+# Reuse the extraction of a previous review when the new one is at least this similar
+# (estimated Jaccard similarity of their word 3-grams, between 0 and 1; None: off)
+# and mentions the same numbers, negations and sentiment or price words
+NEAR_DUPLICATE_THRESHOLD = 0.9
+
+# Number of extracted reviews remembered for that (least recently used ones are dropped)
+NEAR_DUPLICATE_MAX_ENTRIES = 10000
+
+# Show a table with the time spent in each stage of the request below the answer
+SHOW_LATENCY_PANEL = False
+
+# The extraction prompt lives in common/pipelines.py, shared with the HTTP service;
+# this page only handles the user interface
 
 # Function to initialize the OpenAI LLM with the provided API key
+# Cached so the client is built once per API key and reused by every rerun and session
+@st.cache_resource(max_entries=MAX_CACHED_CLIENTS, ttl=CLIENT_TTL)
 def load_LLM(openai_api_key):
    """Logic for loading the chain you want to use should go here."""
-   # Create an OpenAI LLM instance with temperature=0 (deterministic outputs)
-   llm = OpenAI(temperature=0, openai_api_key=openai_api_key)
-   return llm
+   # OpenAI LLM with temperature=0 (deterministic outputs), the shared HTTP client,
+   # the response cache (reviews already extracted are answered from it) and tracing
+   return build_llm("extract", openai_api_key)
+
+# Function to get the index of extracted reviews shared by all sessions
+# A review that only differs from an earlier one by a few words is answered from it
+@st.cache_resource
+def get_duplicate_index():
+   from common.near_duplicates import NearDuplicateIndex  # Reusing the extraction of near-identical reviews
+   return NearDuplicateIndex(threshold=NEAR_DUPLICATE_THRESHOLD, max_entries=NEAR_DUPLICATE_MAX_ENTRIES)
 
 # Configure the Streamlit page
 st.set_page_config(page_title="Extract Key Information from Product Reviews")  # Set browser tab title
@@ -104,9 +95,9 @@ def get_review():
 # Get the review text from the user
 review_input = get_review()
 
-# Check if the review is too long (more than 700 words)
-if len(review_input.split(" ")) > 700:
-   st.write("Please enter a shorter product review. The maximum length is 700 words.")
+# Check if the review is too long (more than MAX_INPUT_WORDS words)
+if len(review_input.split(" ")) > MAX_INPUT_WORDS:
+   st.write(f"Please enter a shorter product review. The maximum length is {MAX_INPUT_WORDS} words.")
    st.stop()  # Stop execution if review is too long
 
 # Section for displaying the extracted information
@@ -122,17 +113,54 @@ if review_input:
            icon="⚠️")
        st.stop()  # Stop execution if API key is missing
 
-   # Initialize the LLM with the API key
-   llm = load_LLM(openai_api_key=openai_api_key)
-
-   # Format the prompt with the user's review
-   prompt_with_review = prompt.format(
-       review=review_input  # User's review text
-   )
-
-   # Generate the key data extraction using the LLM
-   # Note: This should be updated to use llm.invoke() for newer versions of LangChain
-   key_data_extraction = llm(prompt_with_review)
-
-   # Display the extracted information
-   st.write(key_data_extraction)
\ No newline at end of file
+   # Import the request helpers now that there is a review to extract
+   from common.coalescing import coalesced_invoke  # Sharing identical in-flight requests between sessions
+   from common.streaming import TimedStream, stream_completion  # Token streaming helpers
+   from common.tracing import span, trace  # Per-request latency breakdown
+
+   # Time every stage of the request (exported when LLM_TRACE_PATH is set)
+   with trace("extract_review") as request_trace:
+       # Initialize the LLM with the API key
+       with span("load_llm"):
+           llm = load_LLM(openai_api_key=openai_api_key)
+
+       # Look for an already extracted review that is nearly the same as this one
+       match = None
+       if NEAR_DUPLICATE_THRESHOLD is not None:
+           with span("near_duplicate_lookup"):
+               match = get_duplicate_index().lookup(review_input)
+
+       if match is not None:
+           # Display the extraction of the similar review without calling OpenAI
+           key_data_extraction, similarity = match
+           st.write(key_data_extraction)
+           st.caption(f"Reused the extraction of a {similarity:.0%} similar review "
+                      f"(near-duplicate hit rate: {get_duplicate_index().hit_rate:.0%})")
+       else:
+           # Format the prompt with the user's review
+           prompt_with_review = format_review_prompt(review_input)
+
+           if STREAM_RESPONSE:
+               # Stream the extracted information into the page as tokens arrive
+               # Sessions extracting the same review at the same time share one OpenAI call
+               stream = TimedStream(stream_completion(llm, prompt_with_review))
+               key_data_extraction = st.write_stream(stream)
+
+               # Show how long the user waited for the first token and the full answer
+               st.caption(stream.summary())
+           else:
+               # Generate the key data extraction using the LLM
+               # Sessions extracting the same review at the same time share one OpenAI call
+               key_data_extraction = coalesced_invoke(llm, prompt_with_review)
+
+               # Display the extracted information
+               st.write(key_data_extraction)
+
+           # Remember the extraction for similar reviews
+           if NEAR_DUPLICATE_THRESHOLD is not None:
+               get_duplicate_index().add(review_input, key_data_extraction)
+
+   # Show where the time of this request went
+   if SHOW_LATENCY_PANEL:
+       with st.expander("Latency breakdown"):
+           st.dataframe(request_trace.rows(), hide_index=True)
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""Compare the token-aware splitter with greedy packing and the character splitters of apps 03 and 04.
+
+For each splitter, data.txt (repeated ``--copies`` times) is split and run
+through the map_reduce pipeline against the local FakeLLM, which counts one
+token per word. The report shows the number of LLM calls, the tokens sent,
+the average chunk fill (share of the token budget of the map prompt) and how
+many chunks overflow that budget. The text is then split again with one
+sentence appended to its second paragraph, and "reused" counts the chunks of
+the edited text that are identical to a chunk of the original (their
+summaries are reused from the ``ChunkSummaryStore``); only the edited chunk
+should change.
+
+A second table splits a book-length document (``--book-copies`` copies) with
+the content-defined token splitter and with greedy token packing (the
+splitter apps 03 and 04 used before), without summarizing it: the chunk
+count is the number of map calls.
+
+Usage:
+    python benchmarks/chunking.py --copies 50 --book-copies 1600 --context-size 4096
+"""
+import argparse  # For parsing command-line options
+import sys  # For making the shared helpers importable
+import time  # For measuring splitting time
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from langchain.text_splitter import CharacterTextSplitter, RecursiveCharacterTextSplitter  # noqa: E402
+
+from common.chunking import chunk_token_budget, token_text_splitter  # noqa: E402
+from common.fake_llm import FakeLLM  # noqa: E402
+from common.map_reduce import concurrent_map_reduce  # noqa: E402
+
+DATA_FILE = ROOT / "03-streamlit-split-and-summarize" / "data.txt"
+EDIT = " This sentence was added to the second paragraph."
+
+
+def numbered_copies(copies: int) -> str:
+    """Return data.txt repeated ``copies`` times, numbered so that no two copies are identical."""
+    data = DATA_FILE.read_text(encoding="utf-8")
+    return "\n\n".join(f"Copy {copy + 1}. {data}" for copy in range(copies))
+
+
+def edit(text: str) -> str:
+    """Return ``text`` with one sentence appended to its second paragraph."""
+    paragraphs = text.split("\n\n")
+    paragraphs[1] += EDIT
+    return "\n\n".join(paragraphs)
+
+
+def greedy_token_splitter(counter, budget: int) -> RecursiveCharacterTextSplitter:
+    """Pack paragraphs, lines, sentences and words up to ``budget`` tokens, 100 tokens overlapping."""
+    return RecursiveCharacterTextSplitter(
+        separators=["\n\n", "\n", ". ", " ", ""],
+        chunk_size=budget,
+        chunk_overlap=100,
+        length_function=counter.get_num_tokens,
+    )
+
+
+def reused(splitter, chunks, edited: str) -> str:
+    """Return how many chunks of ``edited`` are identical to one of ``chunks``, as "reused/total"."""
+    edited_chunks = splitter.split_text(edited)
+    return f"{sum(chunk in set(chunks) for chunk in edited_chunks)}/{len(edited_chunks)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=50, help="times data.txt is repeated")
+    parser.add_argument("--book-copies", type=int, default=1600, help="times data.txt is repeated for the book")
+    parser.add_argument("--context-size", type=int, default=4096, help="model context window in tokens")
+    args = parser.parse_args()
+
+    # Copies are numbered so that identical chunks of different copies do not count as reused
+    text = numbered_copies(args.copies)
+    counter = FakeLLM(latency=0, max_context_size=args.context_size)
+    budget = chunk_token_budget(counter)
+
+    splitters = {
+        "app 03 (5000 chars)": RecursiveCharacterTextSplitter(
+            separators=["\n\n", "\n"], chunk_size=5000, chunk_overlap=350
+        ),
+        "app 04 (defaults)": CharacterTextSplitter(),
+        "greedy tokens": greedy_token_splitter(counter, budget),
+        "token-aware": token_text_splitter(counter),
+    }
+
+    print(f"document: {counter.get_num_tokens(text)} tokens, chunk budget: {budget} tokens\n")
+    print(f"{'splitter':<22}{'chunks':>8}{'calls':>8}{'tokens sent':>13}{'fill':>7}{'max chunk':>11}"
+          f"{'overflow':>10}{'split ms':>10}{'reused':>12}")
+    for name, splitter in splitters.items():
+        start = time.perf_counter()
+        docs = splitter.create_documents([text])
+        split_ms = (time.perf_counter() - start) * 1000
+        sizes = [counter.get_num_tokens(doc.page_content) for doc in docs]
+
+        llm = FakeLLM(latency=0, max_context_size=args.context_size)
+        concurrent_map_reduce(llm, docs)
+        print(
+            f"{name:<22}{len(docs):>8}{llm.calls:>8}{llm.prompt_tokens:>13}{sum(sizes) / len(sizes) / budget:>7.0%}"
+            f"{max(sizes):>11}{sum(size > budget for size in sizes):>10}{split_ms:>10.1f}"
+            f"{reused(splitter, [doc.page_content for doc in docs], edit(text)):>12}"
+        )
+
+    book = numbered_copies(args.book_copies)
+    print(f"\nbook: {counter.get_num_tokens(book)} tokens\n")
+    print(f"{'splitter':<22}{'chunks':>8}{'fill':>7}{'split ms':>10}{'reused':>12}")
+    for name in ("greedy tokens", "token-aware"):
+        splitter = splitters[name]
+        start = time.perf_counter()
+        chunks = splitter.split_text(book)
+        split_ms = (time.perf_counter() - start) * 1000
+        fill = sum(counter.get_num_tokens(chunk) for chunk in chunks) / len(chunks) / budget
+        print(f"{name:<22}{len(chunks):>8}{fill:>7.0%}{split_ms:>10.1f}{reused(splitter, chunks, edit(book)):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Check request coalescing when the leading request goes away or fails.
+
+Two sessions send the same request to ``FakeLLM``, the second one while the
+first one's call is in flight:
+
+- "abandoned": the first session stops reading after a few tokens (a
+  Streamlit rerun, Stop or closed tab); the second should still receive the
+  complete answer from the single upstream call.
+- "failing": the first session's call fails (``FakeLLM`` answering 429 with
+  retries disabled, standing in for an invalid API key, which is not part of
+  the request key); the second should make its own call and succeed.
+
+The failing case is run with ``coalesced_stream`` and ``coalesced_invoke``.
+"upstream calls" counts the calls ``FakeLLM`` received, 429s included.
+
+Usage:
+    python benchmarks/coalescing.py --latency 0.2 --tokens-per-second 100
+"""
+import argparse  # For parsing command-line options
+import sys  # For making the shared helpers importable
+import threading  # For running the two sessions at once
+import time  # For starting the second session during the first one's call
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from common.coalescing import coalesced_invoke, coalesced_stream  # noqa: E402
+from common.fake_llm import FakeLLM  # noqa: E402
+from common.scheduler import LLMScheduler  # noqa: E402
+
+PROMPT = "Write a short blog post about request coalescing in web services and why it saves calls."
+
+
+def run_session(function, llm, scheduler, read_tokens, results, name):
+    """Run one session's request and record its answer or the error it got."""
+    try:
+        if function is coalesced_invoke:
+            results[name] = coalesced_invoke(llm, PROMPT, scheduler)
+            return
+        stream = coalesced_stream(llm, PROMPT, scheduler)
+        tokens = []
+        for token in stream:
+            tokens.append(token)
+            if len(tokens) == read_tokens:
+                stream.close()  # What a Streamlit rerun does to the generator it was reading
+                break
+        results[name] = "".join(tokens)
+    except Exception as error:
+        results[name] = error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="fake LLM generation speed")
+    args = parser.parse_args()
+
+    def fake_llm(**kwargs):
+        return FakeLLM(**{"latency": args.latency, "tokens_per_second": args.tokens_per_second, **kwargs})
+
+    expected = fake_llm(latency=0, tokens_per_second=None).invoke(PROMPT)
+    scheduler = LLMScheduler(max_retries=0)
+
+    print(f"{'case':<10}{'function':<18}{'first session':<22}{'second session':<22}{'upstream calls':>16}")
+    failures = 0
+    for case in ("abandoned", "failing"):
+        for function in (coalesced_stream, coalesced_invoke):
+            if case == "abandoned" and function is coalesced_invoke:
+                continue  # An invoke caller cannot stop reading halfway
+            first = fake_llm(error_rate=1.0 if case == "failing" else 0.0)
+            second = fake_llm()
+            results = {}
+            sessions = [
+                threading.Thread(target=run_session, args=(function, first, scheduler, 3, results, "first")),
+                threading.Thread(target=run_session, args=(function, second, scheduler, None, results, "second")),
+            ]
+            sessions[0].start()
+            time.sleep(args.latency / 2)
+            sessions[1].start()
+            for session in sessions:
+                session.join()
+
+            upstream_calls = first.calls + first.rate_limited + second.calls + second.rate_limited
+            ok = results["second"] == expected and upstream_calls == (1 if case == "abandoned" else 2)
+            failures += not ok
+            outcomes = [
+                type(result).__name__ if isinstance(result, Exception) else f"{len(result.split())} words"
+                for result in (results["first"], results["second"])
+            ]
+            print(
+                f"{case:<10}{function.__name__:<18}{outcomes[0]:<22}{outcomes[1]:<22}"
+                f"{upstream_calls:>16}  {'ok' if ok else 'FAILED'}"
+            )
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
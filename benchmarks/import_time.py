@@ -0,0 +1,107 @@
+"""Cold-start profile of the five app entry points.
+
+Each app's ``main.py`` is run in a fresh Python process with Streamlit
+already imported (as it is in the server), and without any input, which is
+what happens when a new container serves its first page. The report shows
+the time to render that first page, the modules it imported and whether the
+LangChain/OpenAI stack was among them, then the time to import the helpers
+the app defers until a request is submitted. Times are the median of
+``--runs`` processes.
+
+Usage:
+    python benchmarks/import_time.py --runs 5
+    python benchmarks/import_time.py --apps 03 --top 15  # slowest modules of app 03, from python -X importtime
+"""
+import argparse  # For parsing command-line options
+import json  # For reading the measurements of the child processes
+import re  # For finding the deferred imports of an app
+import statistics  # For the median of the runs
+import subprocess  # For measuring in fresh processes
+import sys  # For the current interpreter
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+
+APPS = {
+    "01": "01-streamlit-redaction-improver",
+    "02": "02-streamlit-blog-post-generator",
+    "03": "03-streamlit-split-and-summarize",
+    "04": "04-streamlit-text-summarization",
+    "05": "05-streamlit-extract-json-from-review",
+}
+
+HEAVY = ["langchain_openai", "openai", "langchain", "langchain_core", "langchain_text_splitters", "tiktoken", "numpy"]
+
+# Run in the child process: render the page once, then import what the app defers
+CHILD = """
+import importlib, json, logging, runpy, sys, time
+import streamlit
+logging.disable(logging.CRITICAL)
+path, deferred, heavy = sys.argv[1], sys.argv[2].split(","), sys.argv[3].split(",")
+sys.path.append({root!r})
+before = set(sys.modules)
+start = time.perf_counter()
+sys.argv = [path]
+runpy.run_path(path, run_name="__main__")
+render = time.perf_counter() - start
+loaded = set(sys.modules) - before
+start = time.perf_counter()
+for module in filter(None, deferred):
+    importlib.import_module(module)
+print(json.dumps({{
+    "render_ms": render * 1000,
+    "modules": len(loaded),
+    "heavy": [name for name in heavy if name in loaded],
+    "deferred_ms": (time.perf_counter() - start) * 1000,
+}}))
+"""
+
+
+def deferred_modules(main: Path) -> list:
+    """Return the modules a page imports inside its functions or request branches."""
+    return sorted(set(re.findall(r"^[ \t]+from (common\.\w+) import", main.read_text(encoding="utf-8"), re.M)))
+
+
+def measure(main: Path) -> dict:
+    code = CHILD.format(root=str(ROOT))
+    args = [sys.executable, "-c", code, str(main), ",".join(deferred_modules(main)), ",".join(HEAVY)]
+    output = subprocess.run(args, capture_output=True, text=True, check=True, cwd=main.parent).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(main: Path, top: int) -> list:
+    """Return ``(cumulative ms, module)`` of the slowest imports of the page, from ``-X importtime``."""
+    code = f"import logging, runpy, sys; import streamlit; logging.disable(logging.CRITICAL); sys.argv = [{str(main)!r}]; runpy.run_path(sys.argv[0])"
+    # Streamlit's own imports are excluded: the server has them loaded before any page runs
+    baseline = subprocess.run([sys.executable, "-X", "importtime", "-c", "import streamlit"], capture_output=True, text=True)
+    known = {line.split("|")[-1].strip() for line in baseline.stderr.splitlines() if "|" in line}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=main.parent)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match and match.group(3) not in known:
+            rows.append((int(match.group(1)) / 1000, match.group(3)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", nargs="+", default=list(APPS), choices=list(APPS), help="apps to profile")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per app")
+    parser.add_argument("--top", type=int, default=0, help="also list the slowest imports of each page")
+    args = parser.parse_args()
+
+    print(f"{'app':<6}{'first page ms':>15}{'modules':>9}{'deferred ms':>13}  heavy modules on first page")
+    for app in args.apps:
+        main_path = ROOT / APPS[app] / "main.py"
+        runs = [measure(main_path) for _ in range(args.runs)]
+        print(
+            f"{app:<6}{statistics.median(r['render_ms'] for r in runs):>15.0f}{runs[-1]['modules']:>9}"
+            f"{statistics.median(r['deferred_ms'] for r in runs):>13.0f}  {', '.join(runs[-1]['heavy']) or '-'}"
+        )
+        for cumulative_ms, module in slowest_imports(main_path, args.top) if args.top else []:
+            print(f"{'':<6}{cumulative_ms:>15.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Measure the wall-clock speedup of the concurrent map phase.
+
+Runs the app 03 splitting + map_reduce pipeline against the local FakeLLM,
+once with a single worker (the serial behaviour of ``load_summarize_chain``)
+and once with ``--concurrency`` workers.
+
+Usage:
+    python benchmarks/map_reduce_speedup.py --copies 20 --latency 0.2 --concurrency 8
+"""
+import argparse  # For parsing command-line options
+import sys  # For making the shared helpers importable
+import time  # For measuring wall-clock time
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: E402
+
+from common.fake_llm import FakeLLM  # noqa: E402
+from common.map_reduce import concurrent_map_reduce  # noqa: E402
+
+DATA_FILE = ROOT / "03-streamlit-split-and-summarize" / "data.txt"
+
+
+def run(docs, latency, max_concurrency):
+    """Summarize ``docs`` and return (seconds, number of LLM calls)."""
+    llm = FakeLLM(latency=latency)
+    start = time.perf_counter()
+    concurrent_map_reduce(llm, docs, max_concurrency=max_concurrency)
+    return time.perf_counter() - start, llm.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=20, help="times data.txt is repeated")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--concurrency", type=int, default=8, help="map calls in flight")
+    args = parser.parse_args()
+
+    # Build a long document and split it exactly like app 03 does
+    text = "\n\n".join([DATA_FILE.read_text(encoding="utf-8")] * args.copies)
+    text_splitter = RecursiveCharacterTextSplitter(
+        separators=["\n\n", "\n"], chunk_size=5000, chunk_overlap=350
+    )
+    docs = text_splitter.create_documents([text])
+
+    serial_time, serial_calls = run(docs, args.latency, 1)
+    concurrent_time, concurrent_calls = run(docs, args.latency, args.concurrency)
+
+    print(f"chunks:      {len(docs)}")
+    print(f"serial:      {serial_time:.2f}s ({serial_calls} calls)")
+    print(f"concurrent:  {concurrent_time:.2f}s ({concurrent_calls} calls, {args.concurrency} workers)")
+    print(f"speedup:     {serial_time / concurrent_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Hit rate and LLM calls saved by the near-duplicate index of app 05.
+
+``--reviews`` synthetic reviews are drawn from ``--distinct`` base reviews
+(each with its own sentiment, delivery time and price perception) and
+lightly edited (casing, punctuation, a word added or dropped) as in real
+review traffic. ``--flip-rate`` of them also get an edit of a few words that
+changes their facts: a negation ("I am happy" to "I am not happy") or another
+price sentence ("the price is fair" to "the price is too high"). Every review
+goes through the app 05 flow: look it up in the index, otherwise extract it
+with the local FakeLLM and store the answer. The report shows the hit rate, the calls made, the wrong reuses (a hit on a
+review with different facts; expected 0) and the time per lookup, for each
+``--thresholds`` value, with ``--max-entries`` bounding the index.
+
+Usage:
+    python benchmarks/near_duplicates.py --reviews 2000 --distinct 200 --thresholds 0.95 0.9 0.8
+"""
+import argparse  # For parsing command-line options
+import random  # For generating reviews
+import sys  # For making the shared helpers importable
+import time  # For measuring wall-clock time
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from common.fake_llm import FakeLLM  # noqa: E402
+from common.near_duplicates import NearDuplicateIndex  # noqa: E402
+from common.pipelines import format_review_prompt  # noqa: E402
+
+PRODUCTS = ["dress", "blender", "phone case", "backpack", "lamp", "jacket", "kettle", "desk chair"]
+# (sentiment, opinion, sentiment and opinion after a negation edit, if any)
+OPINIONS = [
+    ("Positive", "I am happy with it and would recommend it to anyone",
+     "Negative", "I am not happy with it and would not recommend it to anyone"),
+    ("Positive", "Works perfectly and my whole family is happy with it",
+     "Negative", "Never works properly and my whole family is unhappy with it"),
+    ("Negative", "Very disappointed, the material feels cheap and it smells strange",
+     "Positive", "Not disappointed at all, the material does not feel cheap and it smells fine"),
+    ("Negative", "It broke after a week and the support never answered my emails", None, None),
+    ("Neutral", "It does the job, nothing special but nothing wrong either", None, None),
+]
+PRICES = [
+    ("Cheap", "It was cheaper than the other ones I looked at"),
+    ("Expensive", "It was more expensive than the other ones I looked at"),
+    ("Neutral", "The price is fair"),
+    ("Expensive", "The price is too high"),
+    ("Cheap", "The price is low"),
+]
+DAYS = ["two", "three", "four", "five", "seven", "ten", "2", "3", "6", "12"]
+
+
+def render(product: str, opinion: str, days: str, price_text: str) -> str:
+    return (
+        f"I ordered this {product} for my sister. {opinion}. "
+        f"It arrived in {days} days, which was fine for us. {price_text}."
+    )
+
+
+def base_review(rng: random.Random):
+    """Return ``(opinion, price, days, product)`` of a new review (indexes into OPINIONS and PRICES)."""
+    return rng.randrange(len(OPINIONS)), rng.randrange(len(PRICES)), rng.choice(DAYS), rng.choice(PRODUCTS)
+
+
+def edit(rng: random.Random, base, flip_rate: float):
+    """Return ``(facts, review)`` of an edited copy of review ``base``.
+
+    With probability ``flip_rate`` the edit changes the facts (a negation or
+    another price sentence, a few words apart); otherwise it is harmless.
+    """
+    opinion, price, days, product = base
+    sentiment, opinion_text, flipped_sentiment, flipped_text = OPINIONS[opinion]
+    price_label, price_text = PRICES[price]
+    if rng.random() < flip_rate:
+        if flipped_text is not None and rng.random() < 0.5:
+            sentiment, opinion_text = flipped_sentiment, flipped_text
+        else:
+            price_label, price_text = rng.choice([other for other in PRICES if other[0] != price_label])
+    review = render(product, opinion_text, days, price_text)
+    facts = (sentiment, days, price_label)
+
+    words = review.split()
+    change = rng.randrange(6)
+    if change == 0:
+        return facts, review
+    if change == 1:
+        return facts, review.lower()
+    if change == 2:
+        return facts, review.replace(".", "!", 1)
+    if change == 3:
+        return facts, f"{rng.choice(['Honestly,', 'Update:', 'Well,'])} {review}"
+    if change == 4:
+        return facts, f"{review} {rng.choice(['Five stars.', 'Thanks!', 'Shipped in a box.'])}"
+    # Drop a word, but not the delivery time: that would change the facts
+    position = rng.choice([i for i, word in enumerate(words) if word not in DAYS])
+    del words[position]
+    return facts, " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=2000, help="reviews extracted")
+    parser.add_argument("--distinct", type=int, default=200, help="base reviews the others are edited from")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.95, 0.9, 0.8], help="similarities tried")
+    parser.add_argument("--max-entries", type=int, default=10000, help="reviews the index remembers")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--flip-rate", type=float, default=0.2, help="fraction of edits that change the facts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bases = [base_review(rng) for _ in range(args.distinct)]
+    stream = []
+    for _ in range(args.reviews):
+        stream.append(edit(rng, rng.choice(bases), args.flip_rate))
+
+    print(f"{args.reviews} reviews edited from {args.distinct} distinct ones\n")
+    print(f"{'threshold':<11}{'hit rate':>9}{'calls':>7}{'wrong':>7}{'entries':>9}{'evicted':>9}{'lookup ms':>11}")
+    for threshold in args.thresholds:
+        llm = FakeLLM(latency=args.latency)
+        index = NearDuplicateIndex(threshold=threshold, max_entries=args.max_entries)
+        wrong = 0
+        lookup_time = 0.0
+        for facts, review in stream:
+            start = time.perf_counter()
+            match = index.lookup(review)
+            lookup_time += time.perf_counter() - start
+            if match is not None:
+                wrong += match[0][0] != facts
+                continue
+            extraction = llm.invoke(format_review_prompt(review))
+            index.add(review, (facts, extraction))
+        stats = index.stats()
+        print(
+            f"{threshold:<11}{stats['hit_rate']:>9.0%}{llm.calls:>7}{wrong:>7}{stats['entries']:>9}"
+            f"{stats['evictions']:>9}{lookup_time / len(stream) * 1000:>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Token savings and timings of the extractive pre-filter of app 04.
+
+data.txt (repeated ``--copies`` times) is pre-filtered at each ``--ratios``
+value and summarized with the app 04 pipeline (token-aware splitting and
+concurrent map_reduce) against the local FakeLLM. The report shows the words
+kept, the pre-filter time, the chunks and LLM calls, the prompt tokens sent
+and the end-to-end time; ratio 1.0 is the unfiltered baseline.
+
+Usage:
+    python benchmarks/prefilter.py --copies 30 --ratios 1.0 0.7 0.5 0.3 --latency 0.2
+"""
+import argparse  # For parsing command-line options
+import sys  # For making the shared helpers importable
+import time  # For measuring wall-clock time
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from common.chunking import token_text_splitter  # noqa: E402
+from common.extractive import extractive_filter  # noqa: E402
+from common.fake_llm import FakeLLM  # noqa: E402
+from common.map_reduce import concurrent_map_reduce  # noqa: E402
+
+DATA_FILE = ROOT / "03-streamlit-split-and-summarize" / "data.txt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=30, help="times data.txt is repeated")
+    parser.add_argument("--ratios", type=float, nargs="+", default=[1.0, 0.7, 0.5, 0.3], help="fractions of words kept")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--concurrency", type=int, default=4, help="map calls in flight")
+    parser.add_argument("--context-size", type=int, default=4096, help="model context window in tokens")
+    args = parser.parse_args()
+
+    text = "\n\n".join([DATA_FILE.read_text(encoding="utf-8")] * args.copies)
+    print(f"document: {len(text.split())} words\n")
+    print(f"{'ratio':<8}{'words':>8}{'filter ms':>11}{'chunks':>8}{'calls':>7}{'prompt tok':>12}{'saved':>8}{'total s':>9}")
+    baseline = None
+    for ratio in args.ratios:
+        llm = FakeLLM(latency=args.latency, max_context_size=args.context_size)
+        start = time.perf_counter()
+        filtered = extractive_filter(text, ratio)
+        filter_ms = (time.perf_counter() - start) * 1000
+        docs = token_text_splitter(llm).create_documents([filtered])
+        concurrent_map_reduce(llm, docs, max_concurrency=args.concurrency)
+        total = time.perf_counter() - start
+
+        baseline = baseline or llm.prompt_tokens
+        print(
+            f"{ratio:<8}{len(filtered.split()):>8}{filter_ms:>11.1f}{len(docs):>8}{llm.calls:>7}"
+            f"{llm.prompt_tokens:>12}{1 - llm.prompt_tokens / baseline:>8.0%}{total:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
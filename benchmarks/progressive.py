@@ -0,0 +1,80 @@
+"""Time to first output and calls saved by cancelling a summarization (app 03).
+
+data.txt (repeated ``--copies`` times) is split like in app 03 and
+summarized with the concurrent map_reduce against the local FakeLLM, once to
+completion and once cancelled after ``--cancel-after`` of that run's time.
+The report shows when the first chunk summary and the first token of the
+final summary were available, compared with the full run, and the calls
+made by the cancelled run.
+
+Usage:
+    python benchmarks/progressive.py --copies 40 --latency 0.2 --cancel-after 0.5
+"""
+import argparse  # For parsing command-line options
+import sys  # For making the shared helpers importable
+import threading  # For cancelling the run from a timer
+import time  # For measuring wall-clock time
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from common.chunking import token_text_splitter  # noqa: E402
+from common.fake_llm import FakeLLM  # noqa: E402
+from common.map_reduce import SummaryCancelled, concurrent_map_reduce  # noqa: E402
+
+DATA_FILE = ROOT / "03-streamlit-split-and-summarize" / "data.txt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=40, help="times data.txt is repeated")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--concurrency", type=int, default=4, help="map calls in flight")
+    parser.add_argument("--context-size", type=int, default=1024, help="model context window in tokens")
+    parser.add_argument("--cancel-after", type=float, default=0.5, help="fraction of the full run before cancelling")
+    args = parser.parse_args()
+
+    text = "\n\n".join([DATA_FILE.read_text(encoding="utf-8")] * args.copies)
+
+    def run(cancel=None):
+        llm = FakeLLM(latency=args.latency, max_context_size=args.context_size)
+        docs = token_text_splitter(llm).create_documents([text])
+        marks = {}
+        start = time.perf_counter()
+
+        def on_chunk(index, doc, summary):
+            marks.setdefault("first chunk", time.perf_counter() - start)
+
+        def write_final(tokens):
+            parts = []
+            for token in tokens:
+                marks.setdefault("first final token", time.perf_counter() - start)
+                parts.append(token)
+            return "".join(parts)
+
+        try:
+            concurrent_map_reduce(
+                llm, docs, args.concurrency, on_chunk=on_chunk, write_final=write_final, cancel=cancel
+            )
+        except SummaryCancelled as error:
+            marks["cancelled chunks done"] = len(error.summaries)
+        marks["total"] = time.perf_counter() - start
+        # Calls already in flight when cancelled still complete
+        time.sleep(args.latency * 2)
+        return len(docs), llm.calls, marks
+
+    chunks, calls, marks = run()
+    print(f"{chunks} chunks, {calls} calls for the full run")
+    print(f"first chunk summary after {marks['first chunk']:.2f}s, first token of the final summary "
+          f"after {marks['first final token']:.2f}s, complete after {marks['total']:.2f}s")
+
+    cancel = threading.Event()
+    threading.Timer(marks["total"] * args.cancel_after, cancel.set).start()
+    _, cancelled_calls, cancelled_marks = run(cancel)
+    print(f"cancelled after {cancelled_marks['total']:.2f}s with {cancelled_marks['cancelled chunks done']} chunks "
+          f"summarized: {cancelled_calls} calls ({calls - cancelled_calls} saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Exercise the LLM scheduler against a fake endpoint that answers 429s.
+
+Summarizes data.txt (repeated ``--copies`` times, split like app 03) with
+``FakeLLM`` rejecting ``--error-rate`` of the calls, under the given request
+and token limits. Reports the time taken, calls made, 429s received and
+retries. A second run without retries shows the partial results kept when
+chunks fail, and how many calls the resumed run needs.
+
+Usage:
+    python benchmarks/rate_limits.py --copies 40 --error-rate 0.3 --rpm 600
+"""
+import argparse  # For parsing command-line options
+import sys  # For making the shared helpers importable
+import time  # For measuring wall-clock time
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from common.chunking import token_text_splitter  # noqa: E402
+from common.fake_llm import FakeLLM  # noqa: E402
+from common.map_reduce import ChunkSummaryStore, IncompleteSummaryError, concurrent_map_reduce  # noqa: E402
+from common.scheduler import LLMScheduler, TokenBudgetExceeded  # noqa: E402
+
+DATA_FILE = ROOT / "03-streamlit-split-and-summarize" / "data.txt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=40, help="times data.txt is repeated")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per fake LLM call")
+    parser.add_argument("--error-rate", type=float, default=0.3, help="fraction of calls answered with a 429")
+    parser.add_argument("--rpm", type=float, help="requests per minute limit")
+    parser.add_argument("--tpm", type=float, help="tokens per minute limit")
+    parser.add_argument("--concurrency", type=int, default=8, help="map calls in flight")
+    parser.add_argument("--base-delay", type=float, default=0.05, help="first retry backoff in seconds")
+    parser.add_argument("--token-budget", type=int, help="tokens the document may spend")
+    args = parser.parse_args()
+
+    text = "\n\n".join([DATA_FILE.read_text(encoding="utf-8")] * args.copies)
+    llm = FakeLLM(latency=args.latency, error_rate=args.error_rate, temperature=0, max_context_size=1024)
+    docs = token_text_splitter(llm).create_documents([text])
+    print(f"{len(docs)} chunks, {args.error_rate:.0%} of calls answered with 429")
+
+    # With retries: every chunk eventually succeeds
+    scheduler = LLMScheduler(args.rpm, args.tpm, max_retries=10, base_delay=args.base_delay, max_delay=2)
+    start = time.perf_counter()
+    try:
+        concurrent_map_reduce(
+            llm, docs, max_concurrency=args.concurrency, scheduler=scheduler, token_budget=args.token_budget
+        )
+        outcome = "complete"
+    except TokenBudgetExceeded as error:
+        outcome = f"stopped: {error}"
+    print(
+        f"with retries:    {time.perf_counter() - start:.2f}s, {outcome}, {llm.calls} calls, "
+        f"{llm.rate_limited} 429s, {scheduler.retries} retries"
+    )
+
+    # Without retries: failed chunks are reported, the others are kept for the next run
+    store = ChunkSummaryStore()
+    runs = 0
+    while True:
+        runs += 1
+        calls_before = llm.calls
+        try:
+            concurrent_map_reduce(
+                llm, docs, max_concurrency=args.concurrency, summary_store=store,
+                scheduler=LLMScheduler(args.rpm, args.tpm, max_retries=0),
+            )
+        except IncompleteSummaryError as error:
+            print(f"no retries, run {runs}: {len(error.summaries)} chunks kept, {len(error.failed)} failed, "
+                  f"{llm.calls - calls_before} calls")
+            continue
+        except Exception as error:  # The final reduce itself was rate limited
+            print(f"no retries, run {runs}: reduce failed ({type(error).__name__}), {llm.calls - calls_before} calls")
+            continue
+        print(f"no retries, run {runs}: complete, {llm.calls - calls_before} calls")
+        break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Load test of the HTTP service with and without request batching.
+
+Starts ``service/app.py`` in-process with the local stand-in LLM, sends
+``--requests`` requests to one endpoint with ``--concurrency`` in flight, and
+reports throughput, p50/p95 latency and the number of LLM requests (batches)
+for each batch size. The response cache is emptied before each batch size,
+so no run is answered from the responses of the previous one.
+
+Usage:
+    python benchmarks/service_load.py --endpoint rewrite --requests 200 --concurrency 64
+"""
+import argparse  # For parsing command-line options
+import asyncio  # For sending concurrent requests
+import os  # For pointing the response cache at a temporary file
+import statistics  # For latency percentiles
+import sys  # For making the shared helpers importable
+import tempfile  # For the temporary response cache
+import time  # For measuring latency
+from pathlib import Path  # For locating the repository root
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+# Keep benchmark responses out of the apps' real cache
+os.environ["LLM_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_cache.sqlite")
+
+from aiohttp import ClientSession  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+from common.cache import get_response_cache  # noqa: E402
+from service.app import BATCHERS, create_app, fake_factory  # noqa: E402
+
+DATA_FILE = ROOT / "03-streamlit-split-and-summarize" / "data.txt"
+
+
+def request_body(endpoint, index):
+    """Return a distinct request body, so no response comes from the cache."""
+    if endpoint == "rewrite":
+        return {"draft": f"Please, please, please, my customer number {index}, buy my product", "tone": "Formal"}
+    if endpoint == "blog":
+        return {"topic": f"Lesson {index} on unit economics for seed-stage startups"}
+    if endpoint == "extract":
+        return {"review": f"Order {index}: this dress arrived in two days and it is cheaper than the others."}
+    return {"text": f"Document {index}.\n\n" + DATA_FILE.read_text(encoding="utf-8")}
+
+
+async def run_load(args, max_batch_size):
+    # Start every configuration from an empty cache: the requests are the same for each batch size
+    get_response_cache().clear()
+    app = create_app(fake_factory(args.latency), workers=args.workers, max_batch_size=max_batch_size)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async with TestServer(app) as server, ClientSession() as session:
+        async def send(index):
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(server.make_url(f"/{args.endpoint}"), json=request_body(args.endpoint, index)) as response:
+                    response.raise_for_status()
+                    await response.json()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(index) for index in range(args.requests)))
+        elapsed = time.perf_counter() - start
+        batches = app[BATCHERS][args.endpoint].batches
+
+    percentiles = statistics.quantiles(latencies, n=20, method="inclusive")
+    return elapsed, statistics.median(latencies), percentiles[18], batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint", choices=["rewrite", "blog", "summarize", "extract"], default="rewrite")
+    parser.add_argument("--requests", type=int, default=200, help="requests sent in total")
+    parser.add_argument("--concurrency", type=int, default=64, help="requests in flight at once")
+    parser.add_argument("--workers", type=int, default=8, help="service worker threads")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per LLM request")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16], help="max batch sizes to compare")
+    args = parser.parse_args()
+
+    print(f"{'max batch':<12}{'req/s':>8}{'p50 s':>8}{'p95 s':>8}{'batches':>9}")
+    for max_batch_size in args.batch_sizes:
+        elapsed, p50, p95, batches = asyncio.run(run_load(args, max_batch_size))
+        print(f"{max_batch_size:<12}{args.requests / elapsed:>8.1f}{p50:>8.3f}{p95:>8.3f}{batches:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Latency, throughput and memory benchmark of the five apps.
+
+Every app runs against ``common.fake_llm.FakeLLM`` in place of
+``langchain_openai.OpenAI``, so no network access or API key is needed. Apps
+01, 02, 04 and 05 are driven through their ``main.py`` with Streamlit's
+``AppTest``, filling in the widgets the way a user would. App 03 needs a file
+upload, which ``AppTest`` cannot simulate, so its pipeline (streaming ingestion,
+token-aware splitting and concurrent map_reduce) is run directly on data.txt.
+
+For each app the suite reports p50/p95 latency of the request, LLM calls and
+tokens per request, and the peak Python memory allocated during a request.
+One untimed warm-up request per app absorbs one-off costs. The response
+cache and the apps' cached resources (LLM clients, chunk summary stores) are
+cleared before every request unless ``--warm-cache`` is given.
+
+Usage:
+    python benchmarks/suite.py --iterations 5 --latency 0.3 --tokens-per-second 200
+    python benchmarks/suite.py --apps 03 04 --copies 50
+"""
+import argparse  # For parsing command-line options
+import io  # For feeding data.txt to app 03 as an upload
+import os  # For pointing the response cache at a temporary file
+import statistics  # For latency percentiles
+import sys  # For making the shared helpers importable
+import tempfile  # For the temporary response cache
+import time  # For measuring latency
+import tracemalloc  # For measuring peak memory
+from pathlib import Path  # For locating the repository files
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+# Keep benchmark responses out of the apps' real cache
+os.environ["LLM_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_cache.sqlite")
+
+import langchain_openai  # noqa: E402
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from common.cache import get_response_cache, with_response_cache  # noqa: E402
+from common.chunking import token_text_splitter  # noqa: E402
+from common.fake_llm import FakeLLM  # noqa: E402
+from common.ingest import read_lines, split_stream  # noqa: E402
+from common.map_reduce import concurrent_map_reduce  # noqa: E402
+
+DATA_FILE = ROOT / "03-streamlit-split-and-summarize" / "data.txt"
+API_KEY = "sk-benchmark"
+DRAFT = "Please, please, please, My customer, buy my product"
+TOPIC = "Why seed-stage startups should care about unit economics"
+REVIEW = (
+    "This dress is pretty amazing. It arrived in two days, just in time for my wife's "
+    "anniversary present. It is cheaper than the other dresses out there."
+)
+
+# Every FakeLLM created in place of OpenAI, to read their call and token counters
+created_llms = []
+
+
+def fake_openai_factory(latency, tokens_per_second):
+    """Return a replacement for ``langchain_openai.OpenAI`` that builds FakeLLMs."""
+
+    def fake_openai(**kwargs):
+        llm = FakeLLM(latency=latency, tokens_per_second=tokens_per_second, **kwargs)
+        created_llms.append(llm)
+        return llm
+
+    return fake_openai
+
+
+def app_test(folder):
+    """Load an app's main.py and render its first page."""
+    at = AppTest.from_file(str(ROOT / folder / "main.py"), default_timeout=300)
+    return at.run()
+
+
+def bench_01(args):
+    at = app_test("01-streamlit-redaction-improver")
+    at.text_input(key="openai_api_key_input").input(API_KEY).run()
+    return lambda: at.text_area(key="draft_input").input(DRAFT).run()
+
+
+def bench_02(args):
+    at = app_test("02-streamlit-blog-post-generator")
+    at.sidebar.text_input[0].input(API_KEY).run()
+    return lambda: at.text_input[0].input(TOPIC).run()
+
+
+def bench_03(args):
+    data = "\n\n".join([DATA_FILE.read_text(encoding="utf-8")] * args.copies).encode("utf-8")
+    fake_openai = fake_openai_factory(args.latency, args.tokens_per_second)
+
+    def request():
+        # Same steps as app 03 once a file is uploaded
+        llm = with_response_cache(fake_openai(temperature=0, openai_api_key=API_KEY))
+        documents = split_stream(token_text_splitter(llm), read_lines(io.BytesIO(data)))
+        return concurrent_map_reduce(llm, documents, max_concurrency=4)
+
+    return request
+
+
+def bench_04(args):
+    text = "\n\n".join([DATA_FILE.read_text(encoding="utf-8")] * args.copies)
+    at = app_test("04-streamlit-text-summarization")
+    at.text_area[0].input(text).run()
+
+    def request():
+        at.text_input[0].input(API_KEY)
+        return at.button[0].click().run()
+
+    return request
+
+
+def bench_05(args):
+    at = app_test("05-streamlit-extract-json-from-review")
+    at.text_input(key="openai_api_key_input").input(API_KEY).run()
+    return lambda: at.text_area(key="review_input").input(REVIEW).run()
+
+
+BENCHMARKS = {
+    "01": ("rewrite", bench_01),
+    "02": ("blog post", bench_02),
+    "03": ("split + map_reduce", bench_03),
+    "04": ("text map_reduce", bench_04),
+    "05": ("review extraction", bench_05),
+}
+
+
+def llm_counters():
+    """Sum the call and token counters of every FakeLLM created so far."""
+    return (
+        sum(llm.calls for llm in created_llms),
+        sum(llm.prompt_tokens for llm in created_llms),
+        sum(llm.completion_tokens for llm in created_llms),
+    )
+
+
+def clear_caches():
+    """Forget stored responses and chunk summaries so the next request starts cold."""
+    get_response_cache().clear()
+    st.cache_resource.clear()
+
+
+def run_benchmark(app, args):
+    """Run ``args.iterations`` requests of one app and summarize them."""
+    name, setup = BENCHMARKS[app]
+    latencies = []
+    peaks = []
+    for _ in range(args.warmup):
+        # Untimed requests pay one-off costs (imports, Streamlit caches)
+        clear_caches()
+        setup(args)()
+    calls_before, prompt_before, completion_before = llm_counters()
+    for _ in range(args.iterations):
+        request = setup(args)
+        if not args.warm_cache:
+            clear_caches()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = request()
+        latencies.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        if isinstance(result, AppTest) and result.exception:
+            raise RuntimeError(f"app {app} failed: {result.exception[0].message}")
+    calls_after, prompt_after, completion_after = llm_counters()
+
+    percentiles = statistics.quantiles(latencies, n=20, method="inclusive")
+    return {
+        "app": f"{app} {name}",
+        "p50": statistics.median(latencies),
+        "p95": percentiles[18],
+        "calls": (calls_after - calls_before) / args.iterations,
+        "prompt": (prompt_after - prompt_before) / args.iterations,
+        "completion": (completion_after - completion_before) / args.iterations,
+        "peak_mb": max(peaks) / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--iterations", type=int, default=5, help="measured requests per app")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed requests per app")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="generation speed")
+    parser.add_argument("--copies", type=int, default=30, help="times data.txt is repeated for 03/04")
+    parser.add_argument("--warm-cache", action="store_true", help="keep the response cache between requests")
+    args = parser.parse_args()
+
+    langchain_openai.OpenAI = fake_openai_factory(args.latency, args.tokens_per_second)
+
+    print(f"{'app':<24}{'p50 s':>8}{'p95 s':>8}{'calls':>8}{'prompt tok':>12}{'compl. tok':>12}{'peak MB':>9}")
+    for app in args.apps:
+        row = run_benchmark(app, args)
+        print(
+            f"{row['app']:<24}{row['p50']:>8.3f}{row['p95']:>8.3f}{row['calls']:>8.1f}"
+            f"{row['prompt']:>12.0f}{row['completion']:>12.0f}{row['peak_mb']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Persistent, content-addressed LLM response cache shared by all the apps.
+
+Responses are stored in a SQLite file keyed on a hash of the model parameters
+(model name, temperature, max_tokens, ...) and the fully formatted prompt.
+Entries expire after a TTL and the least recently used entries are evicted
+once the cache grows past its size cap.
+
+The cache location and limits can be changed with environment variables:
+
+- ``LLM_CACHE_PATH``: SQLite file (default: ``.llm_cache.sqlite`` in the repository root)
+- ``LLM_CACHE_TTL``: seconds an entry stays valid (default: 7 days)
+- ``LLM_CACHE_MAX_ENTRIES``: maximum number of stored responses (default: 10000)
+"""
+import hashlib  # For content-addressed cache keys
+import json  # For serializing generations
+import os  # For reading the cache configuration
+import sqlite3  # For the on-disk store
+import threading  # For sharing one connection between Streamlit sessions
+import time  # For TTL and LRU bookkeeping
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.outputs import Generation
+
+from common import tracing
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".llm_cache.sqlite"
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class ResponseCache(BaseCache):
+    """SQLite-backed LangChain cache with TTL expiry and LRU eviction."""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_PATH,
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        """Hash the model parameters and the prompt into a cache key."""
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                tracing.count("cache_misses")
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                tracing.count("cache_misses")
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        tracing.count("cache_hits")
+        return [Generation(**generation) for generation in json.loads(value)]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self.make_key(prompt, llm_string)
+        value = json.dumps(
+            [{"text": g.text, "generation_info": g.generation_info} for g in return_val]
+        )
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            # Evict the least recently used entries beyond the size cap
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def size(self) -> int:
+        """Return the number of stored responses."""
+        # Not __len__: LangChain skips caches that are falsy, i.e. empty ones
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide cache configured from the environment."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            ttl = float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL))
+            _shared_cache = ResponseCache(
+                path=Path(os.getenv("LLM_CACHE_PATH", DEFAULT_PATH)),
+                ttl=ttl if ttl > 0 else None,
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+        return _shared_cache
+
+
+def with_response_cache(
+    llm: BaseLanguageModel, cache_nondeterministic: bool = False
+) -> BaseLanguageModel:
+    """Attach the shared response cache to ``llm`` and return it.
+
+    Calls with a temperature above 0 are meant to vary between runs, so they
+    bypass the cache unless ``cache_nondeterministic`` is set.
+    """
+    if getattr(llm, "temperature", 0) == 0 or cache_nondeterministic:
+        llm.cache = get_response_cache()
+    else:
+        llm.cache = False
+    return llm
@@ -0,0 +1,180 @@
+"""Token-aware chunking for the summarizer apps.
+
+Character-based splitters do not know how many tokens a chunk costs, so
+their chunks are either much smaller than the model could take (more map
+calls than needed) or too large for its context. ``token_text_splitter``
+measures chunks with the model's own tokenizer and packs paragraphs into
+chunks of up to the token budget left by the map prompt.
+
+Chunk boundaries are content-defined: once a chunk holds 75% of the
+budget, it ends after the paragraph whose hash is the smallest before the
+limit, not wherever the budget happens to run out. Editing one paragraph
+therefore changes the chunk that holds it (and sometimes the next few)
+instead of shifting every chunk after it, and the summaries of the other
+chunks can be reused (see ``ChunkSummaryStore``). Chunks are about 85% full
+on average, against close to 100% with greedy packing.
+"""
+import hashlib  # For content-defined chunk boundaries
+import re  # For splitting paragraphs
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from langchain.chains.summarize import map_reduce_prompt
+from langchain.text_splitter import RecursiveCharacterTextSplitter, TextSplitter
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.prompts import BasePromptTemplate
+
+# Context window assumed for models that do not report one
+DEFAULT_CONTEXT_SIZE = 4096
+
+# Completion length assumed for models that do not report one (OpenAI's default)
+DEFAULT_COMPLETION_TOKENS = 256
+
+# A chunk is not cut before it holds this fraction of the token budget
+MIN_CHUNK_FILL = 0.75
+
+# About one paragraph in this many chunks' worth of tokens (picked by hash) always ends a chunk
+ANCHOR_CHUNKS = 8
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def chunk_token_budget(
+    llm: BaseLanguageModel, prompt: BasePromptTemplate = map_reduce_prompt.PROMPT
+) -> int:
+    """Return the largest chunk, in tokens, that ``prompt`` can hold.
+
+    The model's context window must fit the prompt itself, the chunk and the
+    completion (``max_tokens``).
+    """
+    context_size = getattr(llm, "max_context_size", DEFAULT_CONTEXT_SIZE)
+    completion_tokens = getattr(llm, "max_tokens", None)
+    if completion_tokens is None or completion_tokens < 0:
+        completion_tokens = DEFAULT_COMPLETION_TOKENS
+    prompt_tokens = llm.get_num_tokens(prompt.format(text=""))
+    return context_size - completion_tokens - prompt_tokens
+
+
+# (piece, tokens, boundary score)
+Piece = Tuple[str, int, float]
+
+
+def boundary_score(piece: str) -> float:
+    """Return a hash of ``piece`` spread evenly over [0, 1); lower scores make stronger boundaries."""
+    digest = hashlib.blake2b(piece.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") / 2**64
+
+
+class ContentDefinedSplitter(TextSplitter):
+    """Split text into chunks of up to ``chunk_size`` tokens on content-defined paragraph boundaries.
+
+    Paragraphs are added to a chunk in order. No chunk is cut before it
+    holds ``min_fill`` of ``chunk_size``; from there up to the limit, it
+    ends after the paragraph with the lowest ``boundary_score``. Anchor
+    paragraphs, picked by their score about once every ``anchor_chunks``
+    chunks' worth of tokens, always end a chunk: two splits that drifted
+    apart after an edit line up again at the next anchor at the latest.
+    Paragraphs longer than ``chunk_size`` are split on lines, sentences and
+    words. Chunks do not overlap.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        length_function: Callable[[str], int],
+        min_fill: float = MIN_CHUNK_FILL,
+        anchor_chunks: int = ANCHOR_CHUNKS,
+    ):
+        super().__init__(chunk_size=chunk_size, chunk_overlap=0, length_function=length_function)
+        self.min_tokens = int(chunk_size * min_fill)
+        self.anchor_tokens = chunk_size * anchor_chunks
+        self._separator_tokens = length_function("\n\n")
+        self._paragraph_splitter = RecursiveCharacterTextSplitter(
+            separators=["\n", ". ", " ", ""],
+            chunk_size=chunk_size,
+            chunk_overlap=0,
+            length_function=length_function,
+        )
+
+    def pieces(self, text: str) -> Iterator[Piece]:
+        """Yield the paragraphs of ``text`` (long ones split further) with their tokens and score."""
+        for paragraph in PARAGRAPH_BREAK.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            tokens = self._length_function(paragraph)
+            parts = [(paragraph, tokens)] if tokens <= self._chunk_size else [
+                (part, self._length_function(part)) for part in self._paragraph_splitter.split_text(paragraph)
+            ]
+            for part, part_tokens in parts:
+                yield part, part_tokens, boundary_score(part)
+
+    def is_anchor(self, piece: Piece) -> bool:
+        # Proportional to the piece's tokens, so anchors are as frequent whatever the paragraph length
+        _, tokens, score = piece
+        return score < tokens / self.anchor_tokens
+
+    def _chunk_end(self, pieces: List[Piece], start: int) -> int:
+        """Return the index of the last piece of the chunk starting at ``pieces[start]``."""
+        end = start
+        tokens = pieces[start][1]
+        best = None
+        while True:
+            if self.is_anchor(pieces[end]) or end + 1 == len(pieces):
+                return end
+            if tokens >= self.min_tokens and (best is None or pieces[end][2] <= pieces[best][2]):
+                best = end
+            tokens += self._separator_tokens + pieces[end + 1][1]
+            if tokens > self._chunk_size:
+                return end if best is None else best
+            end += 1
+
+    def split_text(self, text: str) -> List[str]:
+        pieces = list(self.pieces(text))
+        chunks = []
+        start = 0
+        while start < len(pieces):
+            end = self._chunk_end(pieces, start)
+            chunks.append("\n\n".join(piece for piece, _, _ in pieces[start : end + 1]))
+            start = end + 1
+        return chunks
+
+
+def token_counter(llm: BaseLanguageModel) -> Callable[[str], int]:
+    """Return a function counting tokens like ``llm.get_num_tokens`` without holding ``llm``.
+
+    Splitters are cached and shared between sessions, so their length
+    function must not keep a session's client, and its API key, alive. For
+    OpenAI models the count is made with the model's tiktoken encoding (as
+    ``llm.get_token_ids`` does, but counting special tokens as plain text);
+    other models (e.g. the local ``FakeLLM``) hold no credentials and are
+    used as they are.
+    """
+    if not hasattr(llm, "tiktoken_model_name") or llm.custom_get_token_ids is not None:
+        return llm.get_num_tokens
+    model_name = llm.tiktoken_model_name or llm.model_name
+
+    import tiktoken  # OpenAI's tokenizer, installed with langchain-openai
+
+    try:
+        encoding = tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def token_text_splitter(
+    llm: BaseLanguageModel,
+    chunk_tokens: Optional[int] = None,
+    prompt: BasePromptTemplate = map_reduce_prompt.PROMPT,
+) -> ContentDefinedSplitter:
+    """Create a splitter whose chunks hold up to ``chunk_tokens`` tokens.
+
+    ``chunk_tokens`` defaults to ``chunk_token_budget(llm, prompt)``. Chunks
+    are measured with the model's tokenizer (see ``token_counter``; the
+    splitter keeps no reference to ``llm``) and cut on content-defined
+    paragraph boundaries (see ``ContentDefinedSplitter``).
+    """
+    return ContentDefinedSplitter(
+        chunk_size=chunk_tokens or chunk_token_budget(llm, prompt),
+        length_function=token_counter(llm),
+    )
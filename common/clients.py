@@ -0,0 +1,39 @@
+"""Shared HTTP connection pool for the OpenAI clients of every app.
+
+Each ``OpenAI(...)`` instance normally opens its own HTTP client, so every
+new LLM object pays for fresh TCP and TLS handshakes. Passing the pooled
+client returned by ``get_http_client`` keeps connections alive and reuses
+them across LLM objects, API keys and Streamlit sessions.
+
+The apps cache their LLM objects with ``st.cache_resource`` using the limits
+below, so a client is built once per (API key, parameters) and clients for
+keys that are no longer used are evicted.
+"""
+import threading  # For creating the pool only once
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import httpx  # HTTP client used by the openai package
+
+# Number of cached LLM objects per app (one per API key and parameter set)
+MAX_CACHED_CLIENTS = 32
+
+# Seconds before a cached LLM object is dropped, e.g. after its API key changed
+CLIENT_TTL = 60 * 60
+
+_http_client: Optional["httpx.Client"] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> "httpx.Client":
+    """Return the process-wide pooled HTTP client with keep-alive enabled."""
+    import httpx  # Imported on first use so importing the limits above stays cheap
+
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=httpx.Timeout(600.0, connect=5.0),
+            )
+        return _http_client
@@ -0,0 +1,179 @@
+"""Single-flight coalescing of identical in-flight LLM requests.
+
+When several Streamlit sessions send the same request at the same time (a
+popular blog topic, the same review pasted by many users), only the first
+one calls the model; the others wait for that call and receive its result.
+Followers of a streamed call get the tokens as they arrive, starting with
+those already produced.
+
+Requests are identical when the model parameters, the call options and the
+formatted prompt are. Unlike the response cache, nothing is kept once the
+call completes, so this also applies to calls made with a temperature
+above 0.
+"""
+import hashlib  # For request keys
+import threading  # For sharing calls between sessions
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.language_models import BaseLLM
+
+from common import tracing
+from common.scheduler import LLMScheduler, get_scheduler
+
+
+def request_key(llm: BaseLLM, prompt: str, **kwargs: Any) -> str:
+    """Hash the model parameters, call options and prompt of a request."""
+    params = llm.dict()
+    params.update(kwargs)
+    llm_string = str(sorted((k, str(v)) for k, v in params.items()))
+    return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """Tokens of one in-flight call, readable by any number of followers."""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.condition = threading.Condition()
+        self.followers = 0  # Followers reading the call, counted under the SingleFlight lock
+
+    def publish(self, token: str) -> None:
+        with self.condition:
+            self.tokens.append(token)
+            self.condition.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    def replay(self) -> Iterator[str]:
+        """Yield the tokens of the call as they arrive, until it finishes (see ``error``)."""
+        position = 0
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.done or len(self.tokens) > position)
+                new_tokens = self.tokens[position:]
+                done = self.done
+            yield from new_tokens
+            position += len(new_tokens)
+            if done and position == len(self.tokens):
+                return
+
+
+class SingleFlight:
+    """Share one upstream call between concurrent identical requests.
+
+    If the leading caller stops reading the stream (a Streamlit rerun, Stop
+    or closed tab), the call goes on in the background for its followers. If
+    it fails before its first token, for instance on the leader's own API
+    key, each follower makes its own call instead; a failure after tokens
+    were shared is raised to the followers as a ``RuntimeError``.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0  # Requests served by another request's call
+
+    def stream(self, key: str, produce: Callable[[], Iterable[str]]) -> Iterator[str]:
+        """Yield the tokens of ``produce()``, or of the identical call already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+                self.coalesced += 1
+        if leader:
+            yield from self._lead(key, call, produce)
+            return
+
+        tracing.count("coalesced")
+        try:
+            yield from call.replay()
+        finally:
+            with self._lock:
+                call.followers -= 1
+        if call.error is None:
+            return
+        if call.tokens:
+            raise RuntimeError("the coalesced request failed mid-stream") from call.error
+        # The error may be the leader's own (its API key is not part of the request key)
+        tracing.count("coalesced_fallback")
+        yield from self.stream(key, produce)
+
+    def _lead(self, key: str, call: _Call, produce: Callable[[], Iterable[str]]) -> Iterator[str]:
+        upstream = iter(())
+        try:
+            upstream = iter(produce())
+            for token in upstream:
+                call.publish(token)
+                yield token
+        except GeneratorExit:
+            # The caller stopped reading: finish the call for its followers, if any
+            with self._lock:
+                orphaned = call.followers == 0
+                if orphaned:
+                    del self._calls[key]
+            if orphaned:
+                call.finish()
+                getattr(upstream, "close", lambda: None)()
+            else:
+                threading.Thread(target=self._drain, args=(key, call, upstream), daemon=True).start()
+            raise
+        except BaseException as error:
+            self._finish(key, call, error)
+            raise
+        else:
+            self._finish(key, call)
+
+    def _drain(self, key: str, call: _Call, upstream: Iterator[str]) -> None:
+        """Read the rest of an abandoned leader's call for its followers."""
+        try:
+            for token in upstream:
+                call.publish(token)
+        except Exception as error:
+            self._finish(key, call, error)
+        else:
+            self._finish(key, call)
+
+    def _finish(self, key: str, call: _Call, error: Optional[BaseException] = None) -> None:
+        # Forget the call first, so that followers making their own call do not find it again
+        with self._lock:
+            del self._calls[key]
+        call.finish(error)
+
+    def invoke(self, key: str, run: Callable[[], str]) -> str:
+        """Return ``run()``, or the result of the identical call already in flight."""
+        return "".join(self.stream(key, lambda: [run()]))
+
+
+# Calls in flight in this process, shared by every Streamlit session
+in_flight = SingleFlight()
+
+
+def coalesced_invoke(
+    llm: BaseLLM, prompt: str, scheduler: Optional[LLMScheduler] = None, **kwargs: Any
+) -> str:
+    """``llm.invoke(prompt)`` through ``scheduler``, sharing the call with identical requests in flight.
+
+    ``scheduler`` defaults to the shared one.
+    """
+    scheduler = scheduler or get_scheduler()
+    return in_flight.invoke(request_key(llm, prompt, **kwargs), lambda: scheduler.invoke(llm, prompt, **kwargs))
+
+
+def coalesced_stream(
+    llm: BaseLLM, prompt: str, scheduler: Optional[LLMScheduler] = None, **kwargs: Any
+) -> Iterator[str]:
+    """``llm.stream(prompt)`` through ``scheduler``, sharing the stream with identical requests in flight.
+
+    ``scheduler`` defaults to the shared one.
+    """
+    scheduler = scheduler or get_scheduler()
+    return in_flight.stream(request_key(llm, prompt, **kwargs), lambda: scheduler.stream(llm, prompt, **kwargs))
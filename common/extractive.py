@@ -0,0 +1,101 @@
+"""Local extractive pre-filtering of long texts before summarization.
+
+``extractive_filter`` keeps the most salient sentences of a text, in their
+original order, until ``ratio`` of its words are kept. Salience is the
+TextRank score of a sentence in the graph of TF-IDF cosine similarities
+between sentences, computed with NumPy. Dropping the least central sentences
+before the map phase cuts the tokens sent to the model and, for long
+inputs, the number of chunks (and calls).
+
+Sentences are scored in blocks of ``block_sentences`` so the similarity
+matrix stays small (quadratic in the block, not the whole text).
+"""
+import re  # For splitting sentences and words
+from typing import List, Tuple
+
+import numpy as np
+
+# Sentence ends: ., ! or ? (optionally followed by a closing quote or bracket) and whitespace
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"'”’)\]]*\s+")
+WORD = re.compile(r"\w+")
+
+
+def split_sentences(text: str) -> List[Tuple[int, str]]:
+    """Return ``(paragraph index, sentence)`` pairs of ``text``."""
+    sentences = []
+    for paragraph_index, paragraph in enumerate(re.split(r"\n\s*\n", text)):
+        for sentence in SENTENCE_END.split(paragraph.strip()):
+            if sentence.strip():
+                sentences.append((paragraph_index, sentence.strip()))
+    return sentences
+
+
+def tfidf_matrix(sentences: List[str]) -> np.ndarray:
+    """Return the L2-normalized TF-IDF vectors of ``sentences`` (one row each)."""
+    vocabulary = {}
+    rows, columns = [], []
+    for row, sentence in enumerate(sentences):
+        for word in WORD.findall(sentence.lower()):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(word, len(vocabulary)))
+    counts = np.zeros((len(sentences), max(len(vocabulary), 1)))
+    np.add.at(counts, (np.array(rows, dtype=int), np.array(columns, dtype=int)), 1)
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    weights = counts * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.where(norms == 0, 1, norms)
+
+
+def textrank_scores(vectors: np.ndarray, damping: float = 0.85, iterations: int = 50) -> np.ndarray:
+    """Score sentences by PageRank over their cosine similarity graph."""
+    count = len(vectors)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    # Each sentence spreads its score over its neighbours; isolated sentences over everyone
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight == 0, 1, out_weight), 1 / count)
+    scores = np.full(count, 1 / count)
+    for _ in range(iterations):
+        updated = (1 - damping) / count + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def select_sentences(sentences: List[str], ratio: float) -> np.ndarray:
+    """Return a mask of the highest-scoring sentences holding ``ratio`` of the words."""
+    lengths = np.array([len(sentence.split()) for sentence in sentences])
+    order = np.argsort(-textrank_scores(tfidf_matrix(sentences)), kind="stable")
+    # Keep sentences, best first, until the target word count is reached
+    kept_words = np.cumsum(lengths[order])
+    keep_count = int(np.searchsorted(kept_words, ratio * lengths.sum())) + 1
+    mask = np.zeros(len(sentences), dtype=bool)
+    mask[order[:keep_count]] = True
+    return mask
+
+
+def extractive_filter(text: str, ratio: float = 0.5, block_sentences: int = 500) -> str:
+    """Keep the most salient sentences of ``text``, about ``ratio`` of its words.
+
+    Sentences keep their original order and paragraphs stay separated by a
+    blank line, so the result can be split like the original text.
+    """
+    if not 0 < ratio <= 1:
+        raise ValueError("ratio must be in (0, 1]")
+    sentences = split_sentences(text)
+    if ratio == 1 or len(sentences) < 3:
+        return text
+
+    mask = np.zeros(len(sentences), dtype=bool)
+    for start in range(0, len(sentences), block_sentences):
+        block = [sentence for _, sentence in sentences[start : start + block_sentences]]
+        mask[start : start + len(block)] = select_sentences(block, ratio) if len(block) >= 3 else True
+
+    paragraphs = {}
+    for (paragraph_index, sentence), keep in zip(sentences, mask):
+        if keep:
+            paragraphs.setdefault(paragraph_index, []).append(sentence)
+    return "\n\n".join(" ".join(kept) for kept in paragraphs.values())
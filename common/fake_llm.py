@@ -0,0 +1,149 @@
+"""Deterministic local stand-in for ``langchain_openai.OpenAI``.
+
+Lets the pipelines be exercised and benchmarked without network access or
+an API key. ``FakeLLM`` accepts the constructor arguments the apps pass to
+``OpenAI(...)``, so it can replace it directly.
+"""
+import random  # For injecting rate-limit errors
+import threading  # For counting calls made from several threads
+import time  # For simulating network latency
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, GenerationChunk, LLMResult
+
+# Shared lock protecting the call counters of every FakeLLM instance
+_counter_lock = threading.Lock()
+
+
+class FakeRateLimitError(Exception):
+    """Error answered by ``FakeLLM`` in place of an HTTP 429 response."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("Rate limit reached (fake)")
+        self.retry_after = retry_after
+
+
+class FakeLLM(LLM):
+    """LLM that sleeps to mimic a remote endpoint and answers deterministically.
+
+    Every call waits ``latency`` seconds before the first token, then
+    ``1 / tokens_per_second`` seconds per generated word (if set). Several
+    prompts sent in one ``generate`` call share a single wait. The answer
+    is a sample of ``response_words`` words taken evenly from the prompt, so
+    identical prompts always produce identical completions.
+
+    With ``error_rate`` set, that fraction of calls fails after the latency
+    with ``FakeRateLimitError``, like an endpoint answering 429.
+    """
+
+    latency: float = 0.5  # Seconds spent "waiting for the server" per call
+    tokens_per_second: Optional[float] = None  # Generation speed (None: instant)
+    response_words: int = 40  # Number of words returned per completion
+    max_context_size: int = 4096  # Context window reported to token-aware helpers
+    error_rate: float = 0.0  # Fraction of calls rejected with a fake 429
+    retry_after: Optional[float] = None  # Retry-After seconds sent with a fake 429
+
+    # Same parameters and defaults as ``OpenAI``; they only affect cache keys
+    model_name: str = "fake-instruct"
+    temperature: float = 0.7
+    max_tokens: int = 256
+    openai_api_key: Optional[str] = None
+    http_client: Optional[Any] = None
+
+    calls: int = 0  # Number of completions served so far
+    rate_limited: int = 0  # Number of calls rejected with a fake 429 so far
+    prompt_tokens: int = 0  # Tokens received in prompts so far
+    completion_tokens: int = 0  # Tokens returned in completions so far
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "response_words": self.response_words,
+        }
+
+    def get_token_ids(self, text: str) -> List[int]:
+        """Treat every whitespace-separated word as one token."""
+        return [hash(word) for word in text.split()]
+
+    def _maybe_rate_limit(self) -> None:
+        if self.error_rate and random.random() < self.error_rate:
+            time.sleep(self.latency)
+            with _counter_lock:
+                self.rate_limited += 1
+            raise FakeRateLimitError(self.retry_after)
+
+    def _response_words(self, prompt: str) -> List[str]:
+        words = prompt.split()
+        step = max(1, len(words) // self.response_words)
+        response = words[::step][: self.response_words]
+        with _counter_lock:
+            self.calls += 1
+            self.prompt_tokens += len(words)
+            self.completion_tokens += len(response)
+        return response
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        # Answer every prompt in one simulated round trip, like OpenAI's batched completions
+        self._maybe_rate_limit()
+        responses = [self._response_words(prompt) for prompt in prompts]
+        time.sleep(self.latency)
+        if self.tokens_per_second:
+            time.sleep(max(len(words) for words in responses) / self.tokens_per_second)
+
+        # Report token usage the way OpenAI does, one token per word
+        prompt_tokens = sum(len(prompt.split()) for prompt in prompts)
+        completion_tokens = sum(len(words) for words in responses)
+        return LLMResult(
+            generations=[[Generation(text=" ".join(words))] for words in responses],
+            llm_output={
+                "token_usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+            },
+        )
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        return self._generate([prompt], stop=stop, run_manager=run_manager, **kwargs).generations[0][0].text
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        self._maybe_rate_limit()
+        words = self._response_words(prompt)
+        time.sleep(self.latency)
+        for position, word in enumerate(words):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            chunk = GenerationChunk(text=word if position == 0 else f" {word}")
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,60 @@
+"""Incremental ingestion of uploaded text files.
+
+An upload is decoded line by line and split into chunks as it is read, so
+only a bounded window of the text is held as ``str`` at any time and the
+chunks can be handed to ``concurrent_map_reduce`` as a generator.
+"""
+import codecs  # For decoding UTF-8 incrementally
+from typing import BinaryIO, Iterable, Iterator
+
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+
+# Characters of text buffered before the buffer is split into chunks
+DEFAULT_BUFFER_CHARS = 100_000
+
+
+def read_lines(binary_file: BinaryIO, encoding: str = "utf-8") -> Iterator[str]:
+    """Decode ``binary_file`` from the start, one line at a time."""
+    binary_file.seek(0)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for raw_line in binary_file:
+        yield decoder.decode(raw_line)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def count_words(lines: Iterable[str]) -> int:
+    """Count whitespace-separated words without joining the lines."""
+    return sum(len(line.split()) for line in lines)
+
+
+def split_stream(
+    text_splitter: TextSplitter,
+    lines: Iterable[str],
+    buffer_chars: int = DEFAULT_BUFFER_CHARS,
+) -> Iterator[Document]:
+    """Yield the chunks of a text read as ``lines``.
+
+    Lines are buffered until about ``buffer_chars`` characters have been read
+    and a paragraph ends (or twice that much without a paragraph break). The
+    buffer is then split, every chunk but the last is yielded, and the last
+    one is kept as the start of the next buffer so no chunk is cut short.
+    """
+    buffer = []
+    buffered_chars = 0
+    for line in lines:
+        buffer.append(line)
+        buffered_chars += len(line)
+        paragraph_end = not line.strip()
+        if buffered_chars >= buffer_chars and (paragraph_end or buffered_chars >= 2 * buffer_chars):
+            chunks = text_splitter.split_text("".join(buffer))
+            for chunk in chunks[:-1]:
+                yield Document(page_content=chunk)
+            # Carry the last chunk over, keeping the break that followed it
+            carry = (chunks[-1] + ("\n\n" if paragraph_end else "\n")) if chunks else ""
+            buffer = [carry]
+            buffered_chars = len(carry)
+    for chunk in text_splitter.split_text("".join(buffer)):
+        yield Document(page_content=chunk)
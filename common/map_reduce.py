@@ -0,0 +1,315 @@
+"""Concurrent map_reduce summarization used by the summarizer apps.
+
+``load_summarize_chain(chain_type="map_reduce")`` summarizes the chunks one
+request at a time. ``concurrent_map_reduce`` produces the same kind of
+summary with the same prompts, but runs the map phase on a thread pool,
+can reuse chunk summaries stored by earlier runs, and reduces summaries
+that do not fit in one prompt as a tree, level by level. Every call goes
+through an ``LLMScheduler``, so a rate-limited chunk is retried on its own
+instead of failing the whole run. Callers can follow the run chunk by chunk,
+stream the final summary and cancel the run midway.
+"""
+import hashlib  # For content-addressed chunk keys
+import threading  # For sharing a summary store between sessions
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from langchain.chains.summarize import map_reduce_prompt
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from common import tracing
+from common.chunking import chunk_token_budget
+from common.scheduler import LLMScheduler, TokenBudget, get_scheduler, is_retryable
+from common.streaming import stream_completion
+
+# Seconds between checks of the cancel event while waiting for chunks
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class IncompleteSummaryError(RuntimeError):
+    """Raised when some chunks could not be summarized, even after retries.
+
+    ``summaries`` holds the chunk summaries that were completed (by chunk
+    index) and ``failed`` the errors of the others. Completed summaries are
+    also kept in the run's ``ChunkSummaryStore``, if any, so summarizing the
+    document again only retries the failed chunks.
+    """
+
+    def __init__(self, summaries: Dict[int, str], failed: Dict[int, BaseException]):
+        self.summaries = summaries
+        self.failed = failed
+        first_error = failed[min(failed)]
+        super().__init__(
+            f"{len(failed)} of {len(summaries) + len(failed)} chunks could not be summarized "
+            f"({type(first_error).__name__}: {first_error})"
+        )
+
+
+class SummaryCancelled(RuntimeError):
+    """Raised when a summarization is cancelled before it completes.
+
+    ``summaries`` holds the chunk summaries completed so far (by chunk index);
+    they are also in the run's ``ChunkSummaryStore``, if any.
+    """
+
+    def __init__(self, summaries: Dict[int, str]):
+        self.summaries = summaries
+        super().__init__(f"the summarization was cancelled after {len(summaries)} chunks")
+
+
+class ChunkSummaryStore:
+    """Bounded LRU store of map-phase summaries keyed on chunk content.
+
+    When a slightly edited document is summarized again, most of its chunks
+    are unchanged, so their summaries can be reused instead of asking the
+    model again. ``hits`` and ``misses`` count lookups over the store's life.
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(llm: BaseLanguageModel, prompt_text: str) -> str:
+        """Hash the model parameters and the formatted map prompt of a chunk."""
+        llm_string = str(sorted(llm.dict().items()))
+        return hashlib.sha256(f"{llm_string}\0{prompt_text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._summaries.move_to_end(key)
+            return summary
+
+    def put(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_entries:
+                self._summaries.popitem(last=False)
+
+
+def summarize_chunk(
+    llm: BaseLanguageModel,
+    prompt: BasePromptTemplate,
+    text: str,
+    summary_store: Optional[ChunkSummaryStore] = None,
+    scheduler: Optional[LLMScheduler] = None,
+    budget: Optional[TokenBudget] = None,
+    cancel: Optional[threading.Event] = None,
+) -> str:
+    """Run the map prompt on a single chunk and return its summary.
+
+    If ``summary_store`` already holds a summary for this chunk it is returned
+    without calling the model; otherwise the new summary is stored. The call
+    goes through ``scheduler`` (default: the shared one) and is charged to
+    ``budget``. Once ``cancel`` is set, ``SummaryCancelled`` is raised instead
+    of calling the model.
+    """
+    scheduler = scheduler or get_scheduler()
+    prompt_text = prompt.format(text=text)
+
+    def call_model() -> str:
+        if cancel is not None and cancel.is_set():
+            raise SummaryCancelled({})
+        return scheduler.invoke(llm, prompt_text, budget).strip()
+
+    if summary_store is None:
+        return call_model()
+
+    key = summary_store.make_key(llm, prompt_text)
+    summary = summary_store.get(key)
+    if summary is None:
+        summary = call_model()
+        summary_store.put(key, summary)
+    else:
+        tracing.count("summary_store_hits")
+    return summary
+
+
+def pack_summaries(llm: BaseLanguageModel, summaries: List[str], token_max: int) -> List[List[str]]:
+    """Group consecutive summaries into batches of at most ``token_max`` tokens.
+
+    A summary larger than ``token_max`` on its own forms a batch by itself.
+    """
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for summary in summaries:
+        tokens = llm.get_num_tokens(summary)
+        if batch and batch_tokens + tokens > token_max:
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(summary)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def tree_reduce(
+    llm: BaseLanguageModel,
+    summaries: List[str],
+    pool: ThreadPoolExecutor,
+    prompt: BasePromptTemplate,
+    token_max: int,
+    scheduler: Optional[LLMScheduler] = None,
+    budget: Optional[TokenBudget] = None,
+    cancel: Optional[threading.Event] = None,
+) -> List[str]:
+    """Collapse ``summaries`` until they fit in a single reduce prompt.
+
+    Each level packs the summaries into token-bounded batches and reduces
+    every batch in parallel, so the depth grows logarithmically with the
+    number of chunks.
+    """
+    while len(summaries) > 1:
+        batches = pack_summaries(llm, summaries, token_max)
+        if len(batches) == 1 or len(batches) == len(summaries):
+            # Everything fits already, or no two summaries can be merged
+            break
+        with tracing.span("reduce_level", summaries=len(summaries), batches=len(batches)):
+            futures = [
+                pool.submit(summarize_chunk, llm, prompt, "\n\n".join(batch), None, scheduler, budget, cancel)
+                for batch in batches
+            ]
+            summaries = [future.result() for future in futures]
+    return summaries
+
+
+def concurrent_map_reduce(
+    llm: BaseLanguageModel,
+    docs: Iterable[Document],
+    max_concurrency: int = 4,
+    map_prompt: BasePromptTemplate = map_reduce_prompt.PROMPT,
+    combine_prompt: BasePromptTemplate = map_reduce_prompt.PROMPT,
+    summary_store: Optional[ChunkSummaryStore] = None,
+    token_max: Optional[int] = None,
+    scheduler: Optional[LLMScheduler] = None,
+    token_budget: Optional[int] = None,
+    on_chunk: Optional[Callable[[int, Document, str], None]] = None,
+    write_final: Optional[Callable[[Iterator[str]], str]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> str:
+    """Summarize ``docs`` with a concurrent map phase and a tree reduce.
+
+    At most ``max_concurrency`` map calls are in flight at any time. New
+    documents are only pulled from ``docs`` once a slot frees up, so a lazy
+    iterable is consumed at the pace the model answers (backpressure).
+    The chunk summaries are joined in document order and reduced in one call
+    if they fit in ``token_max`` tokens (default: what ``combine_prompt``
+    leaves of the model's context). Otherwise they are first collapsed level
+    by level with ``tree_reduce``, using the same prompt.
+
+    Chunks whose summary is already in ``summary_store`` are not sent to the
+    model, so only new or changed chunks and the final reduce cost a call.
+
+    Calls are rate limited and retried by ``scheduler`` (default: the shared
+    one). A chunk that still fails after its retries does not stop the other
+    chunks; once they are done, ``IncompleteSummaryError`` is raised with the
+    completed summaries. With ``token_budget`` set, a call that would take the
+    document past that many (estimated) tokens raises ``TokenBudgetExceeded``.
+
+    ``on_chunk(index, doc, summary)`` is called in the calling thread as each
+    chunk summary completes (in completion order), e.g. to show progress.
+    With ``write_final``, the final reduce call is streamed: it receives the
+    tokens (e.g. ``st.write_stream``) and returns the complete text.
+
+    Setting ``cancel`` (from another thread) stops the run: chunks not yet
+    started are dropped, running ones make no further calls and
+    ``SummaryCancelled`` is raised with the summaries completed so far. The
+    event is also set when the run fails or the caller is interrupted (e.g.
+    an exception raised by ``on_chunk``), so no call outlives the run.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    scheduler = scheduler or get_scheduler()
+    budget = TokenBudget(token_budget) if token_budget else None
+    cancel = cancel or threading.Event()
+
+    summaries = {}
+    failed = {}
+    pending = {}
+
+    def collect(future):
+        index, doc = pending.pop(future)
+        try:
+            summaries[index] = future.result()
+        except Exception as error:
+            if not is_retryable(error):
+                raise
+            # Out of retries: keep going so the other chunks are summarized (and stored)
+            failed[index] = error
+        else:
+            if on_chunk is not None:
+                on_chunk(index, doc, summaries[index])
+
+    def collect_some():
+        # Wait for at least one chunk, waking up regularly to notice a cancellation
+        done = set()
+        while not done:
+            if cancel.is_set():
+                raise SummaryCancelled(summaries)
+            done, _ = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        for future in done:
+            collect(future)
+
+    # The pool copies the caller's context so LLM calls are traced under the right span
+    pool = ContextThreadPoolExecutor(max_workers=max_concurrency)
+    try:
+        with tracing.span("map", max_concurrency=max_concurrency):
+            # Time spent producing chunks (e.g. splitting a lazy upload) is recorded as split_ms
+            for index, doc in enumerate(tracing.timed_iter(docs, "split_ms")):
+                # Wait for a free slot before submitting the next chunk
+                while len(pending) >= max_concurrency:
+                    collect_some()
+                if cancel.is_set():
+                    raise SummaryCancelled(summaries)
+                future = pool.submit(
+                    summarize_chunk, llm, map_prompt, doc.page_content, summary_store, scheduler, budget, cancel
+                )
+                pending[future] = index, doc
+            while pending:
+                collect_some()
+            tracing.set_attribute("chunks", len(summaries) + len(failed))
+            if failed:
+                tracing.set_attribute("failed_chunks", len(failed))
+                raise IncompleteSummaryError(summaries, failed)
+
+        with tracing.span("reduce"):
+            # Collapse the chunk summaries, in their original order, until they fit in one prompt
+            if token_max is None:
+                token_max = chunk_token_budget(llm, combine_prompt)
+            ordered = [summaries[index] for index in sorted(summaries)]
+            reduced = tree_reduce(llm, ordered, pool, combine_prompt, token_max, scheduler, budget, cancel)
+            if cancel.is_set():
+                raise SummaryCancelled(summaries)
+
+            # Combine the remaining summaries in a final call
+            final_prompt = combine_prompt.format(text="\n\n".join(reduced))
+            if write_final is None:
+                return scheduler.invoke(llm, final_prompt, budget).strip()
+            return write_final(stream_completion(llm, final_prompt, scheduler, budget=budget)).strip()
+    except SummaryCancelled:
+        # Possibly raised by a chunk or reduce call: report every summary completed so far
+        cancel.set()
+        raise SummaryCancelled(summaries) from None
+    except BaseException:
+        # Stop outstanding work: queued chunks never start and running ones make no further calls
+        cancel.set()
+        raise
+    finally:
+        # After a cancellation, return without waiting for the calls already in flight
+        pool.shutdown(wait=not cancel.is_set(), cancel_futures=True)
@@ -0,0 +1,191 @@
+"""MinHash index of near-duplicate texts and their stored results.
+
+Product reviews repeat themselves ("arrived in two days, great price") with
+small variations that defeat an exact-prompt cache. ``NearDuplicateIndex``
+keeps the MinHash signature of every text it has seen along with its result
+(e.g. the extracted information of a review), and ``lookup`` returns the
+result of a stored text whose estimated Jaccard similarity to the new one,
+over word 3-grams, is at least ``threshold``.
+
+Candidates are found with locality-sensitive hashing (the signature is cut
+into bands; texts sharing a band are compared), so a lookup does not scan the
+whole index. A few words flip the meaning of a review without moving its
+similarity much, so two texts only match if they mention the same numbers,
+negations and sentiment or price words: "arrived in two days" never reuses
+the answer of "arrived in five days", nor "I am not happy" that of "I am
+happy", nor "the price is too high" that of "the price is fair".
+The index holds at most ``max_entries`` texts and evicts the least recently
+used ones beyond that.
+"""
+import hashlib  # For stable shingle hashes
+import re  # For splitting words
+import threading  # For sharing the index between sessions
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common import tracing
+
+WORD = re.compile(r"\w+")
+TERM = re.compile(r"[\w']+")
+
+# Quantities that change the extraction of an otherwise identical review (delivery days, prices)
+NUMBER_WORDS = {
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "fifteen", "twenty", "thirty", "hundred", "couple", "few", "several",
+}
+
+# Words negating what follows them ("n't" contractions are negations too)
+NEGATIONS = {"not", "no", "never", "nothing", "none", "nor", "neither", "without", "hardly", "barely"}
+
+# Sentiment and price words, any change of which can change the extraction
+OPINION_WORDS = {
+    "love", "loved", "like", "liked", "hate", "hated", "happy", "unhappy", "satisfied", "unsatisfied",
+    "disappointed", "disappointing", "recommend", "recommended", "great", "good", "nice", "fine", "ok", "okay",
+    "excellent", "perfect", "perfectly", "amazing", "best", "better", "bad", "worse", "worst", "poor", "terrible",
+    "awful", "horrible", "broke", "broken", "return", "returned", "refund", "cheap", "cheaper", "cheapest",
+    "expensive", "pricey", "overpriced", "affordable", "fair", "reasonable", "high", "low", "bargain", "deal",
+    "worth", "value", "steep", "more", "less", "too",
+}
+
+_MASK_32 = np.uint64(0xFFFFFFFF)
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Return the overlapping word ``size``-grams of ``text`` (lowercased)."""
+    words = WORD.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i : i + size]) for i in range(len(words) - size + 1)]
+
+
+def key_terms(text: str) -> Tuple[str, ...]:
+    """Return the numbers, negations and opinion words of ``text``, sorted, with repeats.
+
+    Negations are counted, so "not happy, would recommend" differs from
+    "not happy, would not recommend".
+    """
+    terms = []
+    for word in TERM.findall(text.lower().replace("\u2019", "'")):
+        word = word.strip("'")
+        if word in NEGATIONS or word.endswith("n't"):
+            terms.append("not")
+        elif word.isdigit() or word in NUMBER_WORDS or word in OPINION_WORDS:
+            terms.append(word)
+    return tuple(sorted(terms))
+
+
+class NearDuplicateIndex:
+    """Bounded LRU index returning the stored result of near-duplicate texts.
+
+    ``threshold`` is the minimum estimated Jaccard similarity for a match;
+    ``num_perm`` hash functions are cut into ``bands`` bands for the LSH.
+    ``hits``, ``misses`` and ``evictions`` count events over the index's life.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        max_entries: int = 10_000,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        random = np.random.default_rng(seed)
+        # Multiply-shift hash family: (a * x + b) mod 2**64, keeping the high 32 bits
+        self._a = random.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = random.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Tuple[str, ...], Any]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], set] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        """Return the MinHash signature of ``text``."""
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+             for s in shingles(text, self.shingle_size)] or [0],
+            dtype=np.uint64,
+        )
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+        return (permuted & _MASK_32).min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def lookup(self, text: str) -> Optional[Tuple[Any, float]]:
+        """Return ``(result, similarity)`` of the most similar stored text, if similar enough."""
+        signature = self.signature(text)
+        terms = key_terms(text)
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates:
+                stored_signature, stored_terms, _ = self._entries[entry_id]
+                if stored_terms != terms:
+                    continue
+                similarity = float(np.mean(stored_signature == signature))
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is None or best_similarity < self.threshold:
+                self.misses += 1
+                result = None
+            else:
+                self.hits += 1
+                self._entries.move_to_end(best_id)
+                result = self._entries[best_id][2], best_similarity
+        tracing.count("near_duplicate_hits" if result else "near_duplicate_misses")
+        return result
+
+    def add(self, text: str, result: Any) -> None:
+        """Store ``result`` for ``text``, evicting the least recently used texts beyond the cap."""
+        signature = self.signature(text)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (signature, key_terms(text), result)
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                old_id, (old_signature, _, _) = self._entries.popitem(last=False)
+                for key in self._band_keys(old_signature):
+                    bucket = self._buckets[key]
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self._buckets[key]
+                self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the size of the index and its hit-rate metrics."""
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "evictions": self.evictions,
+        }
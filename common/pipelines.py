@@ -0,0 +1,234 @@
+"""Prompt and LLM logic of the five apps, independent of Streamlit.
+
+The Streamlit pages and the HTTP service (``service/app.py``) both build
+their prompts and LLMs here, so a pipeline gives the same answer whichever
+front end runs it. Every function is plain Python: nothing runs on import
+and nothing depends on a Streamlit session.
+
+Importing this module is cheap: LangChain, the OpenAI client and the
+summarization stack are imported by the functions that use them, so a page
+can read the constants below and render its widgets before paying for them.
+"""
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseLLM
+    from langchain_core.prompts import PromptTemplate
+
+    from common.map_reduce import ChunkSummaryStore
+
+# OpenAI parameters of each pipeline
+LLM_SETTINGS: Dict[str, Dict[str, Any]] = {
+    "rewrite": {"temperature": 0.7},  # More creative outputs
+    "blog": {"temperature": 0.7, "max_tokens": 2048},  # Room for a 400-word post
+    "summarize": {"temperature": 0},  # Deterministic outputs
+    "extract": {"temperature": 0},
+}
+
+# Maximum length of a draft or review, in words
+MAX_INPUT_WORDS = 700
+
+
+def build_llm(pipeline: str, openai_api_key: str, cache_nondeterministic: bool = False) -> "BaseLLM":
+    """Build the OpenAI LLM of ``pipeline`` with the shared connection pool, cache and tracing.
+
+    The client does not retry on its own: retries and rate limits are handled
+    by ``common.scheduler`` for every call.
+    """
+    from langchain_openai import OpenAI
+
+    from common.cache import with_response_cache
+    from common.clients import get_http_client
+    from common.tracing import with_tracing
+
+    llm = OpenAI(
+        openai_api_key=openai_api_key,
+        http_client=get_http_client(),
+        max_retries=0,
+        **LLM_SETTINGS[pipeline],
+    )
+    llm = with_response_cache(llm, cache_nondeterministic=cache_nondeterministic)
+    return with_tracing(llm)
+
+
+@lru_cache(maxsize=None)
+def prompt_template(template: str) -> "PromptTemplate":
+    """Return the ``PromptTemplate`` of ``template``, built on first use."""
+    from langchain_core.prompts import PromptTemplate
+
+    return PromptTemplate.from_template(template)
+
+
+# Rewrite (app 01)
+
+# Tones and dialects the user can choose from
+TONES = ("Formal", "Informal")
+DIALECTS = ("American", "British")
+
+# Example of each tone; only the example of the selected tone is sent to the model
+tone_examples = {
+    "Formal": "Greetings! OpenAI has announced that Sam Altman is rejoining the company as its Chief Executive Officer. After a period of five days of conversations, discussions, and deliberations, the decision to bring back Altman, who had been previously dismissed, has been made. We are delighted to welcome Sam back to OpenAI.",
+    "Informal": "Hey everyone, it's been a wild week! We've got some exciting news to share - Sam Altman is back at OpenAI, taking up the role of chief executive. After a bunch of intense talks, debates, and convincing, Altman is making his triumphant return to the AI startup he co-founded.",
+}
+
+# Example words of each dialect; only the words of the selected dialect are sent
+dialect_words = {
+    "American": "French Fries, cotton candy, apartment, garbage, \
+        cookie, green thumb, parking lot, pants, windshield",
+    "British": "chips, candyfloss, flag, rubbish, biscuit, green fingers, \
+        car park, trousers, windscreen",
+}
+
+# Example sentence of each dialect; only the sentence of the selected dialect is sent
+dialect_sentences = {
+    "American": "Greetings! OpenAI has announced that Sam Altman is rejoining the company as its Chief Executive Officer. After a period of five days of conversations, discussions, and deliberations, the decision to bring back Altman, who had been previously dismissed, has been made. We are delighted to welcome Sam back to OpenAI.",
+    "British": "On Wednesday, OpenAI, the esteemed artificial intelligence start-up, announced that Sam Altman would be returning as its Chief Executive Officer. This decisive move follows five days of deliberation, discourse and persuasion, after Altman's abrupt departure from the company which he had co-established.",
+}
+
+# Static part of the prompt (instructions and examples); it only depends on the tone and dialect
+prefix_template = """
+    Below is a draft text that may be poorly worded.
+    Your goal is to:
+    - Properly redact the draft text
+    - Convert the draft text to a specified tone
+    - Convert the draft text to a specified dialect
+
+    Here is an example of the {tone} tone:
+    - {tone}: {tone_example}
+
+    Here are some examples of words in the {dialect} dialect:
+    - {dialect}: {dialect_words}
+
+    Example Sentence from the {dialect} dialect:
+    - {dialect}: {dialect_sentence}
+
+    Please start the redaction with a warm introduction. Add the introduction \
+        if you need to.
+    """
+
+# The rendered static part is inserted as {prefix}, followed by the user's draft
+rewrite_template = """{prefix}
+    Below is the draft text, tone, and dialect:
+    DRAFT: {draft}
+    TONE: {tone}
+    DIALECT: {dialect}
+
+    YOUR {dialect} RESPONSE:
+"""
+
+
+@lru_cache(maxsize=None)
+def render_prefix(tone: str, dialect: str) -> str:
+    """Render the static part of the rewrite prompt (once per tone and dialect)."""
+    return prompt_template(prefix_template).format(
+        tone=tone,
+        tone_example=tone_examples[tone],
+        dialect=dialect,
+        dialect_words=dialect_words[dialect],
+        dialect_sentence=dialect_sentences[dialect],
+    )
+
+
+def format_rewrite_prompt(tone: str, dialect: str, draft: str) -> str:
+    """Return the prompt rewriting ``draft`` in a tone and dialect."""
+    return prompt_template(rewrite_template).format(prefix=render_prefix(tone, dialect), tone=tone, dialect=dialect, draft=draft)
+
+
+# Blog post (app 02)
+
+blog_template = """
+   As experienced startup and venture capital writer, 
+   generate a 400-word blog post about {topic}
+   
+   Your response should be in this format:
+   First, print the blog post.
+   Then, sum the total number of words on it and print the result like this: This post has X words.
+   """
+
+
+def format_blog_prompt(topic: str) -> str:
+    """Return the prompt generating a blog post about ``topic``."""
+    return prompt_template(blog_template).format(topic=topic)
+
+
+# Summarization (apps 03 and 04)
+
+def summarize_text(
+    llm: "BaseLLM",
+    text: str,
+    max_concurrency: int = 4,
+    text_splitter: Optional[Any] = None,
+    summary_store: Optional["ChunkSummaryStore"] = None,
+    token_budget: Optional[int] = None,
+    prefilter_ratio: Optional[float] = None,
+) -> str:
+    """Split ``text`` into token-sized chunks and summarize it with map_reduce.
+
+    Pass a cached ``text_splitter`` to avoid rebuilding it for every request.
+    ``token_budget`` caps the tokens the whole summarization may use. With
+    ``prefilter_ratio`` set, only the most salient sentences holding that
+    fraction of the words are sent to the model (see ``common/extractive.py``).
+    """
+    from langchain_core.documents import Document
+
+    from common.chunking import token_text_splitter
+    from common.extractive import extractive_filter
+    from common.map_reduce import concurrent_map_reduce
+    from common.tracing import set_attribute, span
+
+    if prefilter_ratio is not None:
+        with span("prefilter", words=len(text.split())):
+            text = extractive_filter(text, prefilter_ratio)
+            set_attribute("kept_words", len(text.split()))
+    if text_splitter is None:
+        text_splitter = token_text_splitter(llm)
+    with span("split"):
+        docs = [Document(page_content=chunk) for chunk in text_splitter.split_text(text)]
+        set_attribute("chunks", len(docs))
+    with span("map_reduce"):
+        return concurrent_map_reduce(
+            llm, docs, max_concurrency=max_concurrency, summary_store=summary_store, token_budget=token_budget
+        )
+
+
+# Review extraction (app 05)
+
+review_template = """\
+For the following text, extract the following \
+information:
+
+sentiment: Is the customer happy with the product? 
+Answer Positive if yes, Negative if \
+not, Neutral if either of them, or Unknown if unknown.
+
+delivery_days: How many days did it take \
+for the product to arrive? If this \
+information is not found, output No information about this.
+
+price_perception: How does it feel the customer about the price? 
+Answer Expensive if the customer feels the product is expensive, 
+Cheap if the customer feels the product is cheap,
+not, Neutral if either of them, or Unknown if unknown.
+
+Format the output as bullet-points text with the \
+following keys:
+- Sentiment
+- How long took it to deliver?
+- How was the price perceived?
+
+Input example:
+This dress is pretty amazing. It arrived in two days, just in time for my wife's anniversary present. It is cheaper than the other dresses out there, but I think it is worth it for the extra features.
+
+Output example:
+- Sentiment: Positive
+- How long took it to deliver? 2 days
+- How was the price perceived? Cheap
+
+text: {review}
+"""
+
+
+def format_review_prompt(review: str) -> str:
+    """Return the prompt extracting the key information of ``review``."""
+    return prompt_template(review_template).format(review=review)
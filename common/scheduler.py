@@ -0,0 +1,232 @@
+"""Rate-limit-aware scheduling of LLM calls.
+
+Every call goes through an ``LLMScheduler``, which
+
+- waits for the token buckets limiting requests and tokens per minute,
+- retries rate-limited (429), overloaded (5xx) and timed-out calls with
+  jittered exponential backoff, honouring ``Retry-After`` when given, and
+- charges the call to a per-document ``TokenBudget``, if one is passed.
+
+The process-wide scheduler is configured with environment variables:
+
+- ``LLM_REQUESTS_PER_MINUTE``: request limit (default: unlimited)
+- ``LLM_TOKENS_PER_MINUTE``: prompt + completion token limit (default: unlimited)
+- ``LLM_MAX_RETRIES``: retries of a failed call (default: 5)
+"""
+import os  # For reading the scheduler configuration
+import random  # For backoff jitter
+import threading  # For sharing the buckets between sessions
+import time  # For refilling the buckets and sleeping
+from typing import Any, Iterator, List, Optional
+
+import openai  # For recognizing retryable API errors
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.outputs import LLMResult
+
+from common import tracing
+from common.chunking import DEFAULT_COMPLETION_TOKENS
+
+# HTTP statuses worth retrying: timeout, conflict, rate limited, server errors
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+DEFAULT_MAX_RETRIES = 5
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """Raised when a call would take a document over its token budget."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``per_minute`` units per minute.
+
+    The bucket holds at most ``capacity`` units (default: one minute's worth),
+    so short bursts are allowed while the average rate stays under the limit.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60
+        self.capacity = capacity or per_minute
+        self.available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> float:
+        """Block until ``amount`` units are available, take them and return the seconds waited."""
+        # A request larger than the bucket goes through once the bucket is full
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return waited
+                delay = (amount - self.available) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class TokenBudget:
+    """Running total of the tokens one document may spend."""
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def charge(self, tokens: int) -> None:
+        with self._lock:
+            if self.used + tokens > self.max_tokens:
+                raise TokenBudgetExceeded(
+                    f"the document needs more than its budget of {self.max_tokens} tokens "
+                    f"({self.used} already spent)"
+                )
+            self.used += tokens
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Tell whether a failed call is worth retrying (rate limits, timeouts, server errors)."""
+    if isinstance(error, (openai.APIConnectionError, TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUSES
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Return the delay requested by the server in a ``Retry-After`` header, if any."""
+    value = getattr(error, "retry_after", None)
+    response = getattr(error, "response", None)
+    if value is None and response is not None:
+        value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMScheduler:
+    """Run LLM calls under request and token rate limits, with retries.
+
+    Limits of ``None`` are not enforced. A retry waits a random time between
+    0 and ``base_delay * 2 ** attempt`` seconds (capped at ``max_delay``),
+    or the server's ``Retry-After`` if that is longer.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0  # Retries made so far
+
+    def estimate_tokens(self, llm: BaseLanguageModel, prompt: str) -> int:
+        """Upper bound of the tokens a call uses: the prompt plus the completion limit."""
+        max_tokens = getattr(llm, "max_tokens", None)
+        if not isinstance(max_tokens, int) or max_tokens <= 0:
+            max_tokens = DEFAULT_COMPLETION_TOKENS
+        return llm.get_num_tokens(prompt) + max_tokens
+
+    def _admit(self, tokens: int) -> None:
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire()
+        if self.tokens is not None:
+            waited += self.tokens.acquire(tokens)
+        if waited:
+            tracing.count("rate_limited_ms", round(waited * 1000, 1))
+
+    def _backoff(self, error: BaseException, attempt: int) -> None:
+        if attempt >= self.max_retries or not is_retryable(error):
+            raise error
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        delay = max(delay, retry_after(error) or 0)
+        self.retries += 1
+        tracing.count("retries")
+        time.sleep(delay)
+
+    def _prepare(self, llm: BaseLanguageModel, prompt: str, budget: Optional[TokenBudget]) -> int:
+        # Counting tokens costs a tokenizer pass, so only do it when something uses the count
+        if self.tokens is None and budget is None:
+            return 0
+        tokens = self.estimate_tokens(llm, prompt)
+        if budget is not None:
+            budget.charge(tokens)
+        return tokens
+
+    def invoke(
+        self, llm: BaseLanguageModel, prompt: str, budget: Optional[TokenBudget] = None, **kwargs: Any
+    ) -> str:
+        """``llm.invoke(prompt)`` within the rate limits, retrying transient failures."""
+        tokens = self._prepare(llm, prompt, budget)
+        attempt = 0
+        while True:
+            self._admit(tokens)
+            try:
+                return llm.invoke(prompt, **kwargs)
+            except Exception as error:
+                self._backoff(error, attempt)
+                attempt += 1
+
+    def generate(self, llm: BaseLanguageModel, prompts: List[str], **kwargs: Any) -> LLMResult:
+        """``llm.generate(prompts)`` (one batched request) within the rate limits, with retries."""
+        tokens = sum(self._prepare(llm, prompt, None) for prompt in prompts)
+        attempt = 0
+        while True:
+            self._admit(tokens)
+            try:
+                return llm.generate(prompts, **kwargs)
+            except Exception as error:
+                self._backoff(error, attempt)
+                attempt += 1
+
+    def stream(
+        self, llm: BaseLanguageModel, prompt: str, budget: Optional[TokenBudget] = None, **kwargs: Any
+    ) -> Iterator[str]:
+        """``llm.stream(prompt)`` within the rate limits.
+
+        A failure before the first token is retried; once tokens have been
+        yielded the error is raised, since the caller already rendered them.
+        """
+        tokens = self._prepare(llm, prompt, budget)
+        attempt = 0
+        while True:
+            self._admit(tokens)
+            started = False
+            try:
+                for token in llm.stream(prompt, **kwargs):
+                    started = True
+                    yield token
+                return
+            except Exception as error:
+                if started:
+                    raise
+                self._backoff(error, attempt)
+                attempt += 1
+
+
+_shared_scheduler: Optional[LLMScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler configured from the environment."""
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            requests_per_minute = os.getenv("LLM_REQUESTS_PER_MINUTE")
+            tokens_per_minute = os.getenv("LLM_TOKENS_PER_MINUTE")
+            _shared_scheduler = LLMScheduler(
+                requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+                tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            )
+        return _shared_scheduler
@@ -0,0 +1,75 @@
+"""Token streaming helpers for the apps that render a single completion.
+
+``st.write_stream`` renders tokens as they arrive; these helpers feed it from
+an LLM while keeping the response cache in the loop and timing the stream.
+"""
+import time  # For measuring latency
+from typing import Any, Iterable, Iterator, Optional
+
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseLLM
+from langchain_core.outputs import Generation
+
+from common.coalescing import coalesced_stream
+from common.scheduler import LLMScheduler
+
+
+def stream_completion(
+    llm: BaseLLM, prompt: str, scheduler: Optional[LLMScheduler] = None, **kwargs: Any
+) -> Iterator[str]:
+    """Yield the completion of ``prompt`` token by token.
+
+    ``llm.stream`` does not consult the LLM cache, so a cached response is
+    yielded in one piece instead, and a streamed response is stored once it
+    is complete. The cache key matches the one ``llm.invoke`` uses. Identical
+    requests streaming at the same time share one upstream call, made
+    through ``scheduler`` (default: the shared one).
+    """
+    cache = llm.cache if isinstance(llm.cache, BaseCache) else None
+    if cache is not None:
+        params = llm.dict()
+        params["stop"] = None
+        llm_string = str(sorted([(k, v) for k, v in params.items()]))
+        cached = cache.lookup(prompt, llm_string)
+        if cached:
+            yield cached[0].text
+            return
+
+    tokens = []
+    for token in coalesced_stream(llm, prompt, scheduler, **kwargs):
+        tokens.append(token)
+        yield token
+
+    if cache is not None:
+        cache.update(prompt, llm_string, [Generation(text="".join(tokens))])
+
+
+class TimedStream:
+    """Iterate over a token stream while recording how long it took.
+
+    After iteration, ``time_to_first_token`` and ``total_latency`` hold the
+    seconds elapsed between the first request for a token and, respectively,
+    the first token and the end of the stream.
+    """
+
+    def __init__(self, tokens: Iterable[str]):
+        self._tokens = tokens
+        self.time_to_first_token: Optional[float] = None
+        self.total_latency: Optional[float] = None
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        for token in self._tokens:
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - start
+            yield token
+        self.total_latency = time.perf_counter() - start
+        if self.time_to_first_token is None:
+            self.time_to_first_token = self.total_latency
+
+    def summary(self) -> str:
+        """Describe the recorded latencies in one line."""
+        return (
+            f"First token after {self.time_to_first_token:.2f}s, "
+            f"complete after {self.total_latency:.2f}s"
+        )
@@ -0,0 +1,218 @@
+"""Per-request tracing of the app pipelines.
+
+A request is wrapped in ``trace(...)``; inside it, ``span(...)`` blocks time
+the hot-path stages (loading the LLM, splitting, map, reduce, rendering) and
+``TracingCallbackHandler`` adds one span per LLM call with its token usage.
+``count`` and ``set_attribute`` annotate the innermost open span, e.g. with
+chunk counts or cache hits. Spans follow the current ``contextvars`` context,
+so work submitted through a ``ContextThreadPoolExecutor`` nests correctly.
+
+When ``LLM_TRACE_PATH`` is set, every finished trace is appended to that file
+as JSON lines, one span per line, using OpenTelemetry's span field names
+(``traceId``, ``spanId``, ``parentSpanId``, ``startTimeUnixNano``, ...).
+"""
+import json  # For exporting spans
+import os  # For reading the export path
+import secrets  # For trace and span ids
+import threading  # For recording spans from several threads
+import time  # For timestamps
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.outputs import LLMResult
+
+T = TypeVar("T")
+
+_export_lock = threading.Lock()
+_attribute_lock = threading.Lock()
+
+
+@dataclass
+class Span:
+    """A timed stage of a request."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_time_unix_nano: int
+    end_time_unix_nano: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time_unix_nano or time.time_ns()
+        return (end - self.start_time_unix_nano) / 1e6
+
+    def to_otel(self) -> dict:
+        """Return the span with OpenTelemetry field names."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_time_unix_nano,
+            "endTimeUnixNano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """All the spans recorded for one request."""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, None, attributes)
+
+    def start_span(self, name: str, parent: Optional[Span], attributes: Dict[str, Any]) -> Span:
+        new_span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent else None,
+            start_time_unix_nano=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        with self._lock:
+            self.spans.append(new_span)
+        return new_span
+
+    def rows(self) -> List[dict]:
+        """Summarize the spans as table rows, indented by nesting depth."""
+        depth = {None: -1}
+        rows = []
+        for recorded in self.spans:
+            depth[recorded.span_id] = depth.get(recorded.parent_span_id, 0) + 1
+            rows.append({
+                "span": "  " * depth[recorded.span_id] + recorded.name,
+                "ms": round(recorded.duration_ms, 1),
+                **recorded.attributes,
+            })
+        return rows
+
+    def export(self, path: str) -> None:
+        """Append every span of the trace to a JSONL file."""
+        lines = "".join(json.dumps(recorded.to_otel(), default=str) + "\n" for recorded in self.spans)
+        with _export_lock, open(path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """Record a request; its root span is the current span inside the block."""
+    request_trace = Trace(name, **attributes)
+    trace_token = _current_trace.set(request_trace)
+    span_token = _current_span.set(request_trace.root)
+    try:
+        yield request_trace
+    finally:
+        request_trace.root.end_time_unix_nano = time.time_ns()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        path = os.getenv("LLM_TRACE_PATH")
+        if path:
+            request_trace.export(path)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time a stage of the current request (does nothing outside a trace)."""
+    request_trace = _current_trace.get()
+    if request_trace is None:
+        yield None
+        return
+    new_span = request_trace.start_span(name, _current_span.get(), attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    finally:
+        new_span.end_time_unix_nano = time.time_ns()
+        _current_span.reset(token)
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Set an attribute on the innermost open span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes[key] = value
+
+
+def count(key: str, amount: float = 1) -> None:
+    """Add ``amount`` to a counter attribute of the innermost open span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        with _attribute_lock:
+            current.attributes[key] = current.attributes.get(key, 0) + amount
+
+
+def timed_iter(items: Iterable[T], key: str) -> Iterator[T]:
+    """Yield from ``items``, adding the milliseconds spent producing them to ``key``.
+
+    Useful for generators whose work (e.g. splitting) is interleaved with the
+    loop consuming them. The time is added to the span that is current when
+    each item is requested.
+    """
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            count(key, round((time.perf_counter() - start) * 1000, 3))
+        yield item
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback recording one span per LLM call of the current trace.
+
+    Each span holds the prompt count, the time to the first streamed token
+    (if streaming) and the token usage reported by the model.
+    """
+
+    def __init__(self):
+        self._spans: Dict[UUID, Span] = {}
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        request_trace = _current_trace.get()
+        if request_trace is not None:
+            self._spans[run_id] = request_trace.start_span("llm", _current_span.get(), {"prompts": len(prompts)})
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        llm_span = self._spans.get(run_id)
+        if llm_span is not None and "first_token_ms" not in llm_span.attributes:
+            llm_span.attributes["first_token_ms"] = round(llm_span.duration_ms, 1)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is None:
+            return
+        llm_span.end_time_unix_nano = time.time_ns()
+        token_usage = (response.llm_output or {}).get("token_usage", {})
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            if key in token_usage:
+                llm_span.attributes[key] = token_usage[key]
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.end_time_unix_nano = time.time_ns()
+            llm_span.attributes["error"] = type(error).__name__
+
+
+def with_tracing(llm: BaseLanguageModel) -> BaseLanguageModel:
+    """Attach a ``TracingCallbackHandler`` to ``llm`` and return it."""
+    llm.callbacks = [*(llm.callbacks or []), TracingCallbackHandler()]
+    return llm
@@ -0,0 +1 @@
+"""Headless HTTP API serving the app pipelines (see ``service/app.py``)."""
@@ -0,0 +1,235 @@
+"""Headless HTTP API serving the app pipelines without Streamlit.
+
+Endpoints (JSON in, JSON out):
+    POST /rewrite    {"draft": ..., "tone": "Formal", "dialect": "American"} -> {"text": ...}
+    POST /blog       {"topic": ...}                                         -> {"text": ...}
+    POST /summarize  {"text": ...}                                          -> {"summary": ...}
+    POST /extract    {"review": ...}                                        -> {"text": ...}
+    GET  /health                                                            -> pending requests and batches run
+
+The prompts and LLM settings are those of the Streamlit apps
+(``common/pipelines.py``). Concurrent rewrite, blog and extract requests are
+micro-batched into one completions request each; every blocking call runs on
+a bounded worker pool, and requests beyond ``--max-pending`` per endpoint are
+rejected with 503 so the service sheds load instead of queueing forever.
+
+Usage (from the repository root):
+    export OPENAI_API_KEY=sk-...
+    python -m service.app --port 8000 --workers 8
+    python -m service.app --fake-latency 0.3  # local stand-in LLM, no API key needed
+"""
+import argparse  # For parsing command-line options
+import os  # For reading the API key from the environment
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+from langchain_core.language_models import BaseLLM
+
+from common.cache import with_response_cache
+from common.fake_llm import FakeLLM
+from common.map_reduce import ChunkSummaryStore
+from common.pipelines import (
+    DIALECTS,
+    LLM_SETTINGS,
+    MAX_INPUT_WORDS,
+    TONES,
+    build_llm,
+    format_blog_prompt,
+    format_review_prompt,
+    format_rewrite_prompt,
+    summarize_text,
+)
+from common.scheduler import get_scheduler
+from common.tracing import trace, with_tracing
+from service.batching import MicroBatcher, Overloaded
+
+# Builds the LLM of a pipeline ("rewrite", "blog", "summarize" or "extract")
+LLMFactory = Callable[[str], BaseLLM]
+
+BATCHERS = web.AppKey("batchers", Dict[str, MicroBatcher])
+
+
+class InvalidRequest(ValueError):
+    """Raised by the handlers for a malformed request body (answered with 400)."""
+
+
+def openai_factory(openai_api_key: str) -> LLMFactory:
+    """Return an LLM factory building the apps' OpenAI LLMs."""
+    return lambda pipeline: build_llm(pipeline, openai_api_key)
+
+
+def fake_factory(latency: float, tokens_per_second: Optional[float] = None) -> LLMFactory:
+    """Return an LLM factory building local stand-ins, e.g. for load tests."""
+
+    def build(pipeline: str) -> BaseLLM:
+        llm = FakeLLM(latency=latency, tokens_per_second=tokens_per_second, **LLM_SETTINGS[pipeline])
+        return with_tracing(with_response_cache(llm))
+
+    return build
+
+
+def complete_batch(llm: BaseLLM, name: str, prompts: List[str]) -> List[str]:
+    """Answer several prompts with one ``generate`` call (one batched request)."""
+    with trace(name, prompts=len(prompts)):
+        result = get_scheduler().generate(llm, prompts)
+    return [generations[0].text for generations in result.generations]
+
+
+def completion_batcher(
+    llm: BaseLLM, name: str, format_prompt: Callable[..., str], executor: ThreadPoolExecutor, **options: Any
+) -> MicroBatcher:
+    """Return a batcher formatting each request with ``format_prompt`` and completing them together."""
+
+    def run_batch(items: List[dict]) -> List[str]:
+        return complete_batch(llm, name, [format_prompt(**item) for item in items])
+
+    return MicroBatcher(run_batch, executor, **options)
+
+
+async def read_json(request: web.Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise InvalidRequest("the request body is not valid JSON")
+    if not isinstance(body, dict):
+        raise InvalidRequest("the request body must be a JSON object")
+    return body
+
+
+def require_text(body: dict, field: str, max_words: Optional[int] = None) -> str:
+    value = body.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise InvalidRequest(f"'{field}' must be a non-empty string")
+    if max_words is not None and len(value.split(" ")) > max_words:
+        raise InvalidRequest(f"'{field}' is longer than {max_words} words")
+    return value
+
+
+def require_choice(body: dict, field: str, choices: tuple) -> str:
+    value = body.get(field, choices[0])
+    if value not in choices:
+        raise InvalidRequest(f"'{field}' must be one of {', '.join(choices)}")
+    return value
+
+
+async def rewrite(request: web.Request) -> web.Response:
+    body = await read_json(request)
+    item = {
+        "draft": require_text(body, "draft", MAX_INPUT_WORDS),
+        "tone": require_choice(body, "tone", TONES),
+        "dialect": require_choice(body, "dialect", DIALECTS),
+    }
+    return web.json_response({"text": await request.app[BATCHERS]["rewrite"].submit(item)})
+
+
+async def blog(request: web.Request) -> web.Response:
+    body = await read_json(request)
+    item = {"topic": require_text(body, "topic")}
+    return web.json_response({"text": await request.app[BATCHERS]["blog"].submit(item)})
+
+
+async def summarize(request: web.Request) -> web.Response:
+    body = await read_json(request)
+    text = require_text(body, "text")
+    return web.json_response({"summary": await request.app[BATCHERS]["summarize"].submit(text)})
+
+
+async def extract(request: web.Request) -> web.Response:
+    body = await read_json(request)
+    item = {"review": require_text(body, "review", MAX_INPUT_WORDS)}
+    return web.json_response({"text": await request.app[BATCHERS]["extract"].submit(item)})
+
+
+async def health(request: web.Request) -> web.Response:
+    batchers = request.app[BATCHERS]
+    return web.json_response({
+        "status": "ok",
+        "pending": {name: batcher.pending for name, batcher in batchers.items()},
+        "batches": {name: batcher.batches for name, batcher in batchers.items()},
+    })
+
+
+@web.middleware
+async def error_middleware(request: web.Request, handler) -> web.StreamResponse:
+    try:
+        return await handler(request)
+    except InvalidRequest as error:
+        return web.json_response({"error": str(error)}, status=400)
+    except Overloaded as error:
+        return web.json_response({"error": f"overloaded: {error}"}, status=503, headers={"Retry-After": "1"})
+
+
+def create_app(
+    llm_factory: LLMFactory,
+    workers: int = 8,
+    max_batch_size: int = 16,
+    max_wait: float = 0.01,
+    max_pending: int = 256,
+    max_concurrency: int = 4,
+) -> web.Application:
+    """Build the service.
+
+    ``workers`` bounds the threads running LLM calls and summarizations;
+    ``max_concurrency`` is the number of chunks each summarization maps at once.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers)
+    options = {"max_batch_size": max_batch_size, "max_wait": max_wait, "max_pending": max_pending}
+    summarize_llm = llm_factory("summarize")
+    summary_store = ChunkSummaryStore()
+
+    def summarize_batch(texts: List[str]) -> List[str]:
+        summaries = []
+        for text in texts:
+            with trace("summarize", characters=len(text)):
+                summaries.append(summarize_text(summarize_llm, text, max_concurrency, summary_store=summary_store))
+        return summaries
+
+    app = web.Application(middlewares=[error_middleware])
+    app[BATCHERS] = {
+        "rewrite": completion_batcher(llm_factory("rewrite"), "rewrite", format_rewrite_prompt, executor, **options),
+        "blog": completion_batcher(llm_factory("blog"), "blog_post", format_blog_prompt, executor, **options),
+        "extract": completion_batcher(llm_factory("extract"), "extract_review", format_review_prompt, executor, **options),
+        # A summarization is already split into concurrent calls, so it is not batched further
+        "summarize": MicroBatcher(summarize_batch, executor, max_batch_size=1, max_pending=max_pending),
+    }
+    app.router.add_post("/rewrite", rewrite)
+    app.router.add_post("/blog", blog)
+    app.router.add_post("/summarize", summarize)
+    app.router.add_post("/extract", extract)
+    app.router.add_get("/health", health)
+
+    async def shutdown(app: web.Application) -> None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    app.on_cleanup.append(shutdown)
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the app pipelines as a JSON HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8, help="threads running LLM calls")
+    parser.add_argument("--max-batch-size", type=int, default=16, help="requests sent in one completions call")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="time a request waits for others to batch with")
+    parser.add_argument("--max-pending", type=int, default=256, help="requests per endpoint before answering 503")
+    parser.add_argument("--fake-latency", type=float, help="serve a local stand-in LLM with this latency instead of OpenAI")
+    args = parser.parse_args(argv)
+
+    if args.fake_latency is not None:
+        llm_factory = fake_factory(args.fake_latency)
+    else:
+        llm_factory = openai_factory(os.environ["OPENAI_API_KEY"])
+    app = create_app(
+        llm_factory,
+        workers=args.workers,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+        max_pending=args.max_pending,
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
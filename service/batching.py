@@ -0,0 +1,88 @@
+"""Micro-batching of concurrent requests onto a bounded worker pool.
+
+Requests that arrive within ``max_wait`` seconds of each other are grouped
+(up to ``max_batch_size``) and handed to a blocking batch function running
+on a shared ``ThreadPoolExecutor``. For the completion pipelines the batch
+function sends all prompts in one ``llm.generate`` call, which the OpenAI
+client turns into a single batched completions request.
+"""
+import asyncio  # For queueing requests on the event loop
+from concurrent.futures import Executor
+from typing import Any, Callable, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class Overloaded(Exception):
+    """Raised when a batcher already holds ``max_pending`` requests."""
+
+
+class MicroBatcher(Generic[T, R]):
+    """Group concurrent ``submit`` calls into batches run on ``executor``.
+
+    ``run_batch`` receives a list of items and must return one result per
+    item, in order. If it raises, every request of the batch gets the error.
+    At most ``max_pending`` requests wait or run at once; further ones are
+    rejected with ``Overloaded`` so callers can shed load instead of queueing
+    without bound.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[T]], List[R]],
+        executor: Executor,
+        max_batch_size: int = 16,
+        max_wait: float = 0.01,
+        max_pending: int = 256,
+    ):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.pending = 0
+        self.batches = 0  # Number of batches run so far
+        self._queue: List[Tuple[T, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, item: T) -> R:
+        """Queue ``item`` and wait for the result of its batch."""
+        if self.pending >= self.max_pending:
+            raise Overloaded(f"{self.pending} requests already pending")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((item, future))
+        self.pending += 1
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        try:
+            return await future
+        finally:
+            self.pending -= 1
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._queue = self._queue, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        self.batches += 1
+        loop = asyncio.get_running_loop()
+        try:
+            results: List[Any] = await loop.run_in_executor(
+                self.executor, self.run_batch, [item for item, _ in batch]
+            )
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)